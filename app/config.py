@@ -8,6 +8,8 @@ from pydantic_settings import (
     TomlConfigSettingsSource,
 )
 
+from app.typings.consts import GAME_REPLAY_PROCESSES
+
 
 class App(BaseModel):
     telegram_bot_token: str
@@ -15,6 +17,7 @@ class App(BaseModel):
     bot_jwt_secret: str
     db_encryption_secret_key: str
     game_checksum_secret_key: str
+    game_ticket_secret_key: str
 
 
 class Postgres(BaseModel):
@@ -30,11 +33,23 @@ class Logging(BaseModel):
     sentry_dsn: HttpUrl
 
 
+class Scheduler(BaseModel):
+    # Disable when cluster-wide jobs are served by the standalone `python -m app.cron scheduler`
+    run_in_api_workers: bool = True
+
+
+class GameReplay(BaseModel):
+    # Per API worker, so the total on a host is multiplied by the amount of workers
+    processes: int = GAME_REPLAY_PROCESSES
+
+
 class Config(BaseSettings):
     postgres: Postgres
     redis: Redis
     logging: Logging
     app: App
+    scheduler: Scheduler = Scheduler()
+    game_replay: GameReplay = GameReplay()
 
     model_config = SettingsConfigDict(toml_file="config.toml")
 
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import signal
+
+from dishka import AsyncContainer, make_async_container
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import Config, config
+from app.cron.account import backfill_referral_columns
+from app.cron.ranking import rebuild_leaderboards
+from app.cron.referrals import rebuild_referral_stats
+from app.cron.stats import backfill_daily_stats, reconcile_live_metrics
+from app.di.providers.database import ConnectionProvider
+from app.di.providers.redis import RedisProvider
+from app.di.providers.services import ServicesProvider
+from app.services.leader_election import LeaderElection
+from app.services.leaderboard import Leaderboard
+from app.services.live_metrics import LiveMetrics
+from app.setup import setup_logging, setup_scheduler
+from app.typings.consts import LIVE_METRICS_RECONCILE_BATCH_SIZE, USERS_BACKFILL_BATCH_SIZE
+
+
+async def run_scheduler(container: AsyncContainer):
+    leader_election = await container.get(LeaderElection)
+    scheduler = await setup_scheduler(container, run_worker_jobs=False)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop_event.set)
+
+    scheduler.start()
+
+    try:
+        await stop_event.wait()
+    finally:
+        scheduler.shutdown()
+        await leader_election.release()
+
+
+async def run_command(command: str):
+    container = make_async_container(
+        ConnectionProvider(),
+        RedisProvider(),
+        ServicesProvider(),
+        context={Config: config},
+    )
+    sessionmaker = await container.get(async_sessionmaker[AsyncSession])
+
+    try:
+        match command:
+            case "scheduler":
+                await run_scheduler(container)
+            case "rebuild-leaderboards":
+                await rebuild_leaderboards(
+                    sessionmaker=sessionmaker,
+                    leaderboard=await container.get(Leaderboard),
+                )
+            case "rebuild-referral-stats":
+                await rebuild_referral_stats(sessionmaker=sessionmaker)
+            case "backfill-referral-columns":
+                await backfill_referral_columns(
+                    sessionmaker=sessionmaker,
+                    batch_size=USERS_BACKFILL_BATCH_SIZE,
+                )
+            case "backfill-daily-stats":
+                await backfill_daily_stats(sessionmaker=sessionmaker)
+            case "reconcile-live-metrics":
+                await reconcile_live_metrics(
+                    sessionmaker=sessionmaker,
+                    live_metrics=await container.get(LiveMetrics),
+                    batch_size=LIVE_METRICS_RECONCILE_BATCH_SIZE,
+                )
+    finally:
+        await container.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cron")
+    parser.add_argument(
+        "command",
+        choices=[
+            "scheduler",
+            "rebuild-leaderboards",
+            "rebuild-referral-stats",
+            "backfill-referral-columns",
+            "backfill-daily-stats",
+            "reconcile-live-metrics",
+        ],
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run_command(args.command))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,78 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from structlog import get_logger
 
 from app.database.repositories.user import UserRepository
 from app.database.uow.sqlalchemy import SQLAlchemyUoW
+from app.services.activity import ActivityTracker
+from app.services.live_metrics import LiveMetrics
+from app.services.presence import PresenceTracker
+from app.services.user_cache import UserCache
 
+logger = get_logger()
 
-async def reset_overall_profit(
+
+async def flush_users_activity(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    activity_tracker: ActivityTracker,
+    live_metrics: LiveMetrics,
+    presence_tracker: PresenceTracker,
+):
+    activities = activity_tracker.drain()
+
+    if not activities:
+        return
+
+    try:
+        await live_metrics.track_active_users(*activities)
+        await presence_tracker.touch(activities)
+
+        async with sessionmaker() as session:
+            uow = SQLAlchemyUoW(session)
+            user_repo = UserRepository(session)
+
+            await user_repo.renew_last_activity_at_many(activities)
+            await uow.commit()
+    except Exception:
+        activity_tracker.restore(activities)
+        raise
+
+
+async def settle_referral_rewards(
     sessionmaker: async_sessionmaker[AsyncSession],
+    user_cache: UserCache,
+    batch_size: int,
 ):
-    async with sessionmaker() as session:
-        uow = SQLAlchemyUoW(session)
-        user_repo = UserRepository(session)
+    while True:
+        async with sessionmaker() as session:
+            uow = SQLAlchemyUoW(session)
+            user_repo = UserRepository(session, user_cache=user_cache)
+
+            settled_ids = await user_repo.settle_referral_rewards(batch_size=batch_size)
+            await uow.commit()
+
+        if not settled_ids:
+            break
+
+
+async def backfill_referral_columns(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    batch_size: int,
+):
+    last_id = 0
+
+    while True:
+        async with sessionmaker() as session:
+            uow = SQLAlchemyUoW(session)
+            user_repo = UserRepository(session)
+
+            batch_last_id = await user_repo.backfill_referral_columns_batch(
+                after_id=last_id,
+                batch_size=batch_size,
+            )
+            await uow.commit()
+
+        if batch_last_id is None:
+            break
 
-        await user_repo.reset_daily_overall_profit()
-        await uow.commit()
+        last_id = batch_last_id
+        logger.info(f"Referral columns are backfilled up to user id {last_id}")
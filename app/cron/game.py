@@ -1,24 +1,174 @@
+import asyncio
+import datetime
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog import get_logger
 
-from app.database.repositories.user import UserRepository
+from app.database.repositories.game import GameRepository
 from app.database.uow.sqlalchemy import SQLAlchemyUoW
+from app.services.game_session import GameSessionStore
+from app.services.live_metrics import LiveMetrics
+from app.utils.dt import get_month_start
+from app.utils.fraud import detect_suspicious_games
+
+logger = get_logger()
+
+
+async def flush_finished_games(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    game_session_store: GameSessionStore,
+    live_metrics: LiveMetrics,
+    batch_size: int,
+):
+    while True:
+        games = await game_session_store.take_finished(batch_size=batch_size)
+
+        if not games:
+            break
+
+        # Games stay in the processing list until committed, inserting them again is a no-op
+        async with sessionmaker() as session:
+            uow = SQLAlchemyUoW(session)
+            game_repo = GameRepository(session)
+
+            await game_repo.create_many(games)
+            await uow.commit()
+
+        await game_session_store.acknowledge_finished(*games)
+        await live_metrics.track_players(*{game.user_id for game in games})
+
+
+async def reap_abandoned_games(
+    game_session_store: GameSessionStore,
+    abandoned_after_seconds: int,
+    batch_size: int,
+):
+    reaped_amount = 0
+
+    while True:
+        reaped_batch_amount = await game_session_store.reap_abandoned(
+            abandoned_after_seconds=abandoned_after_seconds,
+            batch_size=batch_size,
+        )
+        reaped_amount += reaped_batch_amount
+
+        if reaped_batch_amount < batch_size:
+            break
+
+    if reaped_amount:
+        logger.info(f"Closed {reaped_amount} abandoned games")
+
+
+async def reconcile_games_in_progress(
+    game_session_store: GameSessionStore,
+    batch_size: int,
+):
+    stale_amount = await game_session_store.reconcile(batch_size=batch_size)
 
+    if stale_amount:
+        logger.info(f"Removed {stale_amount} stale entries from games in progress")
+
+
+async def maintain_games_partitions(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    premake_months: int,
+    retention_months: int,
+):
+    upcoming_months = [get_month_start(offset) for offset in range(premake_months + 1)]
+    retention_start = get_month_start(-retention_months)
 
-async def reset_game_energy(sessionmaker: async_sessionmaker[AsyncSession]):
     async with sessionmaker() as session:
         uow = SQLAlchemyUoW(session)
+        game_repo = GameRepository(session)
+
+        existing_months = await game_repo.get_partitions_months()
+
+        for month in upcoming_months:
+            if month not in existing_months:
+                await game_repo.create_partition(month)
+                logger.info(f"Created games partition for {month.isoformat()}")
+
+        for month in existing_months:
+            if month < retention_start:
+                await game_repo.archive_partition(month)
+                logger.info(f"Archived games partition for {month.isoformat()}")
 
-        user_repo = UserRepository(session)
-        await user_repo.reset_game_energy()
         await uow.commit()
 
 
-async def reset_game_highscore(
+async def review_suspicious_games(
     sessionmaker: async_sessionmaker[AsyncSession],
+    review_window_days: int,
+    history_days: int,
+    fetch_batch_size: int,
+    write_batch_size: int,
 ):
+    review_started_after = datetime.datetime.utcnow() - datetime.timedelta(days=review_window_days)
+    history_started_after = datetime.datetime.utcnow() - datetime.timedelta(days=history_days)
+
+    reviewed_amount = 0
+    suspicious_amount = 0
+
+    # Every pending game arrives with its history aggregates, so batches are reviewed on their own
     async with sessionmaker() as session:
-        uow = SQLAlchemyUoW(session)
-        user_repo = UserRepository(session)
+        game_repo = GameRepository(session)
 
-        await user_repo.reset_daily_highscore()
-        await uow.commit()
+        async for partition in game_repo.stream_pending_review(
+            started_after=review_started_after,
+            history_started_after=history_started_after,
+            batch_size=fetch_batch_size,
+        ):
+            # The NumPy pass runs in a thread, so the event loop keeps serving requests meanwhile
+            game_ids, verdicts = await asyncio.to_thread(_review_partition, partition)
+
+            for offset in range(0, game_ids.size, write_batch_size):
+                async with sessionmaker() as write_session:
+                    uow = SQLAlchemyUoW(write_session)
+                    write_game_repo = GameRepository(write_session)
+
+                    await write_game_repo.apply_fraud_verdicts(
+                        game_ids=game_ids[offset : offset + write_batch_size].tolist(),
+                        verdicts=verdicts[offset : offset + write_batch_size].tolist(),
+                        started_after=review_started_after,
+                    )
+                    await uow.commit()
+
+            reviewed_amount += game_ids.size
+            suspicious_amount += np.count_nonzero(verdicts)
+
+    if reviewed_amount:
+        logger.info(f"Reviewed {reviewed_amount} games, {suspicious_amount} marked as suspicious")
+
+
+def _review_partition(
+    partition: Sequence[Sequence[Any]],
+) -> Tuple[NDArray[np.object_], NDArray[np.bool_]]:
+    (
+        game_ids,
+        scores,
+        durations,
+        games_per_hour,
+        history_games_amounts,
+        history_score_means,
+        history_score_deviations,
+    ) = (
+        np.asarray(column, dtype=dtype)
+        for column, dtype in zip(
+            zip(*partition),
+            (np.object_, np.int64, np.float64, np.int64, np.int64, np.float64, np.float64),
+        )
+    )
+
+    verdicts = detect_suspicious_games(
+        scores=scores,
+        durations=durations,
+        games_per_hour=games_per_hour,
+        history_games_amounts=history_games_amounts,
+        history_score_means=history_score_means,
+        history_score_deviations=history_score_deviations,
+    )
+
+    return game_ids, verdicts
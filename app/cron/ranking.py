@@ -0,0 +1,52 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database.repositories.user import UserRepository
+from app.schemas.base import UserRankingEntity
+from app.schemas.user.ranking import GetRankingChunkResponse
+from app.services.leaderboard import Leaderboard
+from app.services.ranking_snapshot import RankingSnapshotStore
+from app.typings.consts import (
+    RANKING_CHUNK_SIZE,
+    RANKING_FIELDS,
+    RANKING_MAX_TOP_PLACE,
+    RANKING_REBUILD_BATCH_SIZE,
+)
+
+
+async def rebuild_leaderboards(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    leaderboard: Leaderboard,
+):
+    async with sessionmaker() as session:
+        user_repo = UserRepository(session)
+
+        await leaderboard.rebuild(
+            user_repo.stream_ranking_scores(batch_size=RANKING_REBUILD_BATCH_SIZE)
+        )
+
+
+async def publish_ranking_snapshots(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    ranking_snapshot_store: RankingSnapshotStore,
+):
+    async with sessionmaker() as session:
+        user_repo = UserRepository(session)
+
+        for ranking_field in RANKING_FIELDS:
+            ranking_top = await user_repo.get_ranking_page(
+                ranking_field=ranking_field,
+                limit=RANKING_MAX_TOP_PLACE,
+            )
+            chunks = {}
+
+            for offset in range(0, RANKING_MAX_TOP_PLACE, RANKING_CHUNK_SIZE):
+                ranking_chunk = GetRankingChunkResponse.from_ranking_chunk(
+                    ranking_chunk=[
+                        UserRankingEntity.from_ranking_row(ranking_row=row, score=row.score)
+                        for row in ranking_top[offset : offset + RANKING_CHUNK_SIZE]
+                    ],
+                    ranking_offset=offset,
+                )
+                chunks[offset] = ranking_chunk.model_dump_json().encode("utf-8")
+
+            await ranking_snapshot_store.publish(ranking_field=ranking_field, chunks=chunks)
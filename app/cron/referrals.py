@@ -0,0 +1,15 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database.repositories.referral_stats import ReferralStatsRepository
+from app.database.uow.sqlalchemy import SQLAlchemyUoW
+
+
+async def rebuild_referral_stats(
+    sessionmaker: async_sessionmaker[AsyncSession],
+):
+    async with sessionmaker() as session:
+        uow = SQLAlchemyUoW(session)
+        referral_stats_repo = ReferralStatsRepository(session)
+
+        await referral_stats_repo.rebuild()
+        await uow.commit()
@@ -0,0 +1,70 @@
+import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog import get_logger
+
+from app.database.repositories.daily_stats import DailyStatsRepository
+from app.database.repositories.user import UserRepository
+from app.database.uow.sqlalchemy import SQLAlchemyUoW
+from app.services.live_metrics import LiveMetrics
+from app.services.presence import PresenceTracker
+from app.utils.dt import get_client_side_date
+
+logger = get_logger()
+
+
+async def close_out_daily_stats(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    rewrite_days: int,
+):
+    day_to = get_client_side_date() - datetime.timedelta(days=1)
+    day_from = day_to - datetime.timedelta(days=rewrite_days - 1)
+
+    async with sessionmaker() as session:
+        uow = SQLAlchemyUoW(session)
+        daily_stats_repo = DailyStatsRepository(session)
+
+        await daily_stats_repo.rollup_users(day_from=day_from, day_to=day_to)
+        await daily_stats_repo.rollup_games(day_from=day_from, day_to=day_to)
+        await uow.commit()
+
+    logger.info(f"Closed out daily stats for {day_to.isoformat()}")
+
+
+async def backfill_daily_stats(
+    sessionmaker: async_sessionmaker[AsyncSession],
+):
+    day_to = get_client_side_date() - datetime.timedelta(days=1)
+
+    async with sessionmaker() as session:
+        uow = SQLAlchemyUoW(session)
+        daily_stats_repo = DailyStatsRepository(session)
+
+        await daily_stats_repo.rollup_users(day_from=None, day_to=day_to)
+        await daily_stats_repo.rollup_games(day_from=None, day_to=day_to)
+        await uow.commit()
+
+
+async def reconcile_live_metrics(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    live_metrics: LiveMetrics,
+    batch_size: int,
+):
+    await live_metrics.start_users_rebuild()
+
+    async with sessionmaker() as session:
+        user_repo = UserRepository(session)
+
+        users_amount = await user_repo.get_users_amount()
+        async for blocked_users_ids in user_repo.stream_blocked_ids(batch_size=batch_size):
+            await live_metrics.add_rebuilt_blocked_users(*blocked_users_ids)
+
+    if not await live_metrics.finish_users_rebuild(total_users=users_amount):
+        logger.warning("Live metrics rebuild outlived its lock and was dropped")
+        return
+
+    logger.info(f"Reconciled live metrics with {users_amount} users")
+
+
+async def record_presence_history(presence_tracker: PresenceTracker):
+    await presence_tracker.record_history()
@@ -5,6 +5,12 @@ __all__ = [
     "BonusTask",
     "BonusTaskCompletition",
     "ReferralLink",
+    "ReferralAncestor",
+    "ReferralReward",
+    "ReferralStats",
+    "UserScoreStats",
+    "DailyUserStats",
+    "DailyGameStats",
     "DailyReward",
     "DailyRewardCompletition",
 ]
@@ -12,6 +18,11 @@ __all__ = [
 from .base import Base
 from .bonus_task import BonusTask, BonusTaskCompletition
 from .daily_reward import DailyReward, DailyRewardCompletition
+from .daily_stats import DailyGameStats, DailyUserStats
 from .game import Game
+from .referral_ancestor import ReferralAncestor
 from .referral_link import ReferralLink
+from .referral_reward import ReferralReward
+from .referral_stats import ReferralStats
 from .user import User
+from .user_score_stats import UserScoreStats
@@ -0,0 +1,35 @@
+import datetime
+
+from sqlalchemy import BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.models import Base
+
+
+class DailyUserStats(Base):
+    __tablename__ = "daily_user_stats"
+
+    # Closed client side days per referral link, today is always computed live
+    day: Mapped[datetime.date] = mapped_column(primary_key=True)
+    referral_link_id: Mapped[str] = mapped_column(primary_key=True)
+
+    new_users: Mapped[int] = mapped_column(server_default="0")
+    blocked_users: Mapped[int] = mapped_column(server_default="0")
+    new_players: Mapped[int] = mapped_column(server_default="0")
+    blocked_players: Mapped[int] = mapped_column(server_default="0")
+
+    # Totals at the end of the day
+    total_users: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    inactive_users: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    players: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    inactive_players: Mapped[int] = mapped_column(BigInteger, server_default="0")
+
+
+class DailyGameStats(Base):
+    __tablename__ = "daily_game_stats"
+
+    day: Mapped[datetime.date] = mapped_column(primary_key=True)
+    referral_link_id: Mapped[str] = mapped_column(primary_key=True)
+
+    games_played: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    unique_players: Mapped[int] = mapped_column(server_default="0")
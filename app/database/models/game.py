@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import UUID, ForeignKey, func
+from sqlalchemy import UUID, DateTime, ForeignKey, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.models import Base
@@ -8,16 +8,29 @@ from app.database.models import Base
 
 class Game(Base):
     __tablename__ = "games"
+    # Monthly partitions are created and archived by the partitions maintenance job
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
     id: Mapped[str] = mapped_column(
         UUID(as_uuid=False),
         primary_key=True,
         server_default=func.gen_random_uuid(),
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     score: Mapped[int | None]
 
     marked_as_suspicious: Mapped[bool | None] = mapped_column(index=True)
     on_fraud_check: Mapped[bool | None] = mapped_column(index=True)
 
     finished_at: Mapped[datetime.datetime | None]
+
+    # Partition key has to be a part of the primary key
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime,
+        primary_key=True,
+        server_default=text("TIMEZONE('utc', now())"),
+    )
+
+
+# Games are appended in created_at order, so a BRIN index stays tiny and precise enough
+Index("ix_games_created_at", Game.created_at, postgresql_using="brin")
@@ -0,0 +1,27 @@
+from sqlalchemy import BigInteger, ForeignKey, Index, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.models import Base
+
+
+class ReferralAncestor(Base):
+    __tablename__ = "referral_ancestors"
+
+    # Closure of the referral tree: every referrer of the user up to the max referral level
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    level: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    ancestor_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="CASCADE"),
+    )
+
+
+Index(
+    "ix_referral_ancestors_ancestor_id_level",
+    ReferralAncestor.ancestor_id,
+    ReferralAncestor.level,
+)
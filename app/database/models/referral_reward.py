@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.mixins import AutoIncrementIdMixin
+from app.database.models import Base
+
+
+class ReferralReward(Base, AutoIncrementIdMixin):
+    __tablename__ = "referral_rewards"
+
+    # Append-only ledger, folded into users.referral_balance by the settlement job
+    referrer_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+    )
+    amount: Mapped[int] = mapped_column(BigInteger)
@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, ForeignKey, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.models import Base
+
+
+class ReferralStats(Base):
+    __tablename__ = "referral_stats"
+
+    # Per-level totals over referral_ancestors, kept up to date on every registration
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    level: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    referrals_amount: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    referrals_profit: Mapped[int] = mapped_column(BigInteger, server_default="0")
@@ -1,7 +1,16 @@
 import datetime
-from typing import List, TYPE_CHECKING
-
-from sqlalchemy import BigInteger, SmallInteger, text
+from typing import Any, Dict, List, TYPE_CHECKING
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    ForeignKey,
+    Index,
+    SmallInteger,
+    case,
+    func,
+    text,
+)
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -14,6 +23,7 @@ from app.typings.consts import (
     INITIAL_REFERRAL_BALANCE,
 )
 from app.typings.enums import UserFarmingStatus, UserLanguage
+from app.utils.dt import get_daily_epoch
 
 if TYPE_CHECKING:
     from app.database.models import BonusTaskCompletition, DailyRewardCompletition
@@ -30,15 +40,30 @@ class User(Base):
 
     is_banned: Mapped[bool] = mapped_column(server_default="0")
     source: Mapped[str | None] = mapped_column(index=True)
+    referrer_id: Mapped[int | None] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="SET NULL"),
+        index=True,
+    )
+    referral_link_id: Mapped[str | None] = mapped_column(
+        ForeignKey("referral_links.id", ondelete="SET NULL"),
+        index=True,
+    )
     referral_registration_bonus: Mapped[int] = mapped_column(server_default="0")
 
-    balance: Mapped[int] = mapped_column(BigInteger, default=INITIAL_BALANCE, index=True)
+    balance: Mapped[int] = mapped_column(BigInteger, default=INITIAL_BALANCE)
     referral_balance: Mapped[int] = mapped_column(BigInteger, default=INITIAL_REFERRAL_BALANCE)
-    daily_overall_profit: Mapped[int] = mapped_column(server_default="0", index=True)
+    daily_overall_profit: Mapped[int] = mapped_column(server_default="0")
+
+    # UTC day the daily counters (game energy, daily highscore and profit) belong to
+    daily_epoch: Mapped[datetime.date] = mapped_column(
+        default=get_daily_epoch,
+        server_default=text("(TIMEZONE('utc', now()))::date"),
+    )
 
     game_energy: Mapped[int] = mapped_column(SmallInteger, default=DAILY_GAME_ENERGY_AMOUNT)
-    game_daily_highscore: Mapped[int] = mapped_column(server_default="0", index=True)
-    game_alltime_highscore: Mapped[int] = mapped_column(server_default="0", index=True)
+    game_daily_highscore: Mapped[int] = mapped_column(server_default="0")
+    game_alltime_highscore: Mapped[int] = mapped_column(server_default="0")
 
     farming_started_at: Mapped[datetime.datetime | None]
     farming_duration_hours: Mapped[int] = mapped_column(
@@ -51,7 +76,7 @@ class User(Base):
     last_activity_at: Mapped[datetime.datetime] = mapped_column(
         server_default=text("TIMEZONE('utc', now())")
     )
-    bot_blocked_at: Mapped[datetime.datetime | None]
+    bot_blocked_at: Mapped[datetime.datetime | None] = mapped_column(index=True)
 
     completed_bonus_tasks: Mapped[List["BonusTaskCompletition"]] = relationship(
         back_populates="user",
@@ -82,3 +107,74 @@ class User(Base):
     @hybrid_property
     def farming_total_profit(self) -> int:
         return self.farming_duration_hours * self.farming_hour_mining_rate
+
+    @hybrid_property
+    def current_game_energy(self) -> int:
+        if self.daily_epoch == get_daily_epoch():
+            return self.game_energy
+
+        return max(self.game_energy, DAILY_GAME_ENERGY_AMOUNT)
+
+    @current_game_energy.inplace.expression
+    @classmethod
+    def _current_game_energy_expression(cls) -> ColumnElement[int]:
+        return case(
+            (cls.daily_epoch == get_daily_epoch(), cls.game_energy),
+            else_=func.greatest(cls.game_energy, DAILY_GAME_ENERGY_AMOUNT),
+        )
+
+    @hybrid_property
+    def current_game_daily_highscore(self) -> int:
+        return self.game_daily_highscore if self.daily_epoch == get_daily_epoch() else 0
+
+    @current_game_daily_highscore.inplace.expression
+    @classmethod
+    def _current_game_daily_highscore_expression(cls) -> ColumnElement[int]:
+        return case((cls.daily_epoch == get_daily_epoch(), cls.game_daily_highscore), else_=0)
+
+    @hybrid_property
+    def current_daily_overall_profit(self) -> int:
+        return self.daily_overall_profit if self.daily_epoch == get_daily_epoch() else 0
+
+    @current_daily_overall_profit.inplace.expression
+    @classmethod
+    def _current_daily_overall_profit_expression(cls) -> ColumnElement[int]:
+        return case((cls.daily_epoch == get_daily_epoch(), cls.daily_overall_profit), else_=0)
+
+    @classmethod
+    def roll_daily_counters(cls, **values: Any) -> Dict[str, Any]:
+        # Any write to a daily counter moves all of them to the current epoch in the same UPDATE
+        return {
+            "daily_epoch": get_daily_epoch(),
+            "game_energy": cls.current_game_energy,
+            "game_daily_highscore": cls.current_game_daily_highscore,
+            "daily_overall_profit": cls.current_daily_overall_profit,
+            **values,
+        }
+
+
+# Match the ranking order exactly: score DESC, then first_name and id as tiebreakers
+Index("ix_users_balance_ranking", User.balance.desc(), User.first_name, User.id)
+# Daily rankings only cover users whose counters belong to the current epoch
+Index(
+    "ix_users_daily_overall_profit_ranking",
+    User.daily_epoch,
+    User.daily_overall_profit.desc(),
+    User.first_name,
+    User.id,
+)
+Index(
+    "ix_users_game_daily_highscore_ranking",
+    User.daily_epoch,
+    User.game_daily_highscore.desc(),
+    User.first_name,
+    User.id,
+)
+Index(
+    "ix_users_game_alltime_highscore_ranking",
+    User.game_alltime_highscore.desc(),
+    User.first_name,
+    User.id,
+)
+# Stats for the days not closed out yet are counted live over the latest registrations
+Index("ix_users_created_at", User.created_at)
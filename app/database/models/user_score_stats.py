@@ -0,0 +1,28 @@
+import datetime
+
+from sqlalchemy import BigInteger, Double, ForeignKey, Integer, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.models import Base
+
+
+class UserScoreStats(Base):
+    __tablename__ = "user_score_stats"
+
+    # Running statistics over the user's clean games (Welford), updated on every game finish
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    games_amount: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    score_mean: Mapped[float] = mapped_column(Double, server_default="0")
+    score_m2: Mapped[float] = mapped_column(Double, server_default="0")
+    score_max: Mapped[int] = mapped_column(Integer, server_default="0")
+
+    # Tumbling window of all finished games, used for the games rate
+    window_started_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=text("TIMEZONE('utc', now())"),
+    )
+    window_games_amount: Mapped[int] = mapped_column(Integer, server_default="0")
+
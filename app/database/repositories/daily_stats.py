@@ -0,0 +1,411 @@
+import datetime
+from typing import List, Tuple, Type
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Date,
+    DateTime,
+    ScalarSelect,
+    cast,
+    delete,
+    distinct,
+    func,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import DailyGameStats, DailyUserStats, Game, User
+from app.typings.consts import CLIENT_SIDE_TIMEZONE, DAILY_STATS_NO_REFERRAL_LINK
+from app.utils.dt import get_client_side_date, get_utc_start_of_client_side_day
+
+
+class DailyStatsRepository:
+    def __init__(
+        self,
+        session: AsyncSession,
+    ):
+        self._session = session
+
+    async def rollup_users(self, day_from: datetime.date | None, day_to: datetime.date) -> None:
+        period_end = get_utc_start_of_client_side_day(day_to + datetime.timedelta(days=1))
+        referral_link_id = func.coalesce(User.referral_link_id, DAILY_STATS_NO_REFERRAL_LINK)
+
+        registrations_day = self._produce_client_side_day_statement(User.created_at)
+        blocks_day = self._produce_client_side_day_statement(User.bot_blocked_at)
+
+        # Totals need the whole history, so flows are grouped over all the users
+        flows = union_all(
+            select(
+                registrations_day,
+                referral_link_id.label("referral_link_id"),
+                func.count().label("new_users"),
+                literal(0).label("blocked_users"),
+                func.count().filter(User.used_webapp.is_(True)).label("new_players"),
+                literal(0).label("blocked_players"),
+            )
+            .where(User.created_at < period_end)
+            .group_by(registrations_day, referral_link_id),
+            select(
+                blocks_day,
+                referral_link_id,
+                literal(0),
+                func.count(),
+                literal(0),
+                func.count().filter(User.used_webapp.is_(True)),
+            )
+            .where(User.bot_blocked_at < period_end)
+            .group_by(blocks_day, referral_link_id),
+        ).subquery()
+
+        daily_flows = (
+            select(
+                flows.c.day,
+                flows.c.referral_link_id,
+                func.sum(flows.c.new_users).label("new_users"),
+                func.sum(flows.c.blocked_users).label("blocked_users"),
+                func.sum(flows.c.new_players).label("new_players"),
+                func.sum(flows.c.blocked_players).label("blocked_players"),
+            )
+            .group_by(flows.c.day, flows.c.referral_link_id)
+            .cte("daily_flows")
+        )
+
+        period_start = func.coalesce(
+            day_from,
+            select(func.min(daily_flows.c.day)).scalar_subquery(),
+        )
+
+        # Every referral link gets a row for every day, so the last closed day holds all totals
+        days = (
+            func.generate_series(
+                cast(period_start, DateTime),
+                cast(literal(day_to), DateTime),
+                datetime.timedelta(days=1),
+            )
+            .table_valued("day")
+            .render_derived()
+        )
+        referral_links = select(distinct(daily_flows.c.referral_link_id).label("id")).subquery()
+        grid = select(
+            cast(days.c.day, Date).label("day"),
+            referral_links.c.id.label("referral_link_id"),
+        ).subquery()
+
+        flow_columns = ("new_users", "blocked_users", "new_players", "blocked_players")
+        totals_before = (
+            select(
+                daily_flows.c.referral_link_id,
+                *(func.sum(daily_flows.c[column]).label(column) for column in flow_columns),
+            )
+            .where(daily_flows.c.day < period_start)
+            .group_by(daily_flows.c.referral_link_id)
+            .subquery()
+        )
+
+        day_flows = {
+            column: func.coalesce(daily_flows.c[column], 0) for column in flow_columns
+        }
+        running_total = {
+            column: func.coalesce(totals_before.c[column], 0)
+            + func.sum(day_flows[column]).over(
+                partition_by=grid.c.referral_link_id,
+                order_by=grid.c.day,
+            )
+            for column in flow_columns
+        }
+
+        rollup = (
+            select(
+                grid.c.day,
+                grid.c.referral_link_id,
+                *day_flows.values(),
+                running_total["new_users"],
+                running_total["blocked_users"],
+                running_total["new_players"],
+                running_total["blocked_players"],
+            )
+            .select_from(grid)
+            .outerjoin(
+                daily_flows,
+                (daily_flows.c.day == grid.c.day)
+                & (daily_flows.c.referral_link_id == grid.c.referral_link_id),
+            )
+            .outerjoin(
+                totals_before,
+                totals_before.c.referral_link_id == grid.c.referral_link_id,
+            )
+        )
+
+        # Blocks may be lifted later, so the whole period is rewritten instead of upserted
+        clear_statement = delete(DailyUserStats).where(DailyUserStats.day <= day_to)
+        if day_from is not None:
+            clear_statement = clear_statement.where(DailyUserStats.day >= day_from)
+
+        await self._session.execute(clear_statement)
+        await self._session.execute(
+            insert(DailyUserStats).from_select(
+                [
+                    "day",
+                    "referral_link_id",
+                    *flow_columns,
+                    "total_users",
+                    "inactive_users",
+                    "players",
+                    "inactive_players",
+                ],
+                rollup,
+            )
+        )
+
+    async def rollup_games(self, day_from: datetime.date | None, day_to: datetime.date) -> None:
+        day = self._produce_client_side_day_statement(Game.created_at)
+        referral_link_id = func.coalesce(User.referral_link_id, DAILY_STATS_NO_REFERRAL_LINK)
+
+        rollup = (
+            select(
+                day,
+                referral_link_id,
+                func.count(),
+                func.count(distinct(Game.user_id)),
+            )
+            .join(User, User.id == Game.user_id)
+            .where(
+                Game.created_at
+                < get_utc_start_of_client_side_day(day_to + datetime.timedelta(days=1))
+            )
+            .group_by(day, referral_link_id)
+        )
+        if day_from is not None:
+            rollup = rollup.where(Game.created_at >= get_utc_start_of_client_side_day(day_from))
+
+        # Days of the archived partitions are kept as they are
+        statement = insert(DailyGameStats).from_select(
+            ["day", "referral_link_id", "games_played", "unique_players"],
+            rollup,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[DailyGameStats.day, DailyGameStats.referral_link_id],
+            set_={
+                "games_played": statement.excluded.games_played,
+                "unique_players": statement.excluded.unique_players,
+            },
+        )
+        await self._session.execute(statement)
+
+    async def get_users_amount_stats(
+        self, referral_link_id: str | None = None
+    ) -> Tuple[int, int, int]:
+        closed_day, live_period_start = await self._get_live_period(DailyUserStats)
+
+        statement = select(
+            self._produce_closed_day_sum_statement(
+                DailyUserStats.total_users, closed_day, referral_link_id
+            )
+            + self._produce_live_users_count_statement(
+                User.created_at, live_period_start, referral_link_id
+            ),
+            self._produce_closed_day_sum_statement(
+                DailyUserStats.inactive_users, closed_day, referral_link_id
+            )
+            + self._produce_live_users_count_statement(
+                User.bot_blocked_at, live_period_start, referral_link_id
+            ),
+        )
+
+        total_users, inactive_users = (await self._session.execute(statement)).one()
+
+        return total_users, total_users - inactive_users, inactive_users
+
+    async def get_users_dynamic_stats(
+        self, referral_link_id: str | None = None
+    ) -> Tuple[int, int, int]:
+        _, live_period_start = await self._get_live_period(DailyUserStats)
+        today = get_client_side_date()
+        periods_days = (
+            today,
+            today - datetime.timedelta(days=6),
+            today - datetime.timedelta(days=29),
+        )
+        closed_days = select(
+            *(
+                func.coalesce(
+                    func.sum(DailyUserStats.new_users - DailyUserStats.blocked_users).filter(
+                        DailyUserStats.day >= period_day
+                    ),
+                    0,
+                ).label(f"period_{index}")
+                for index, period_day in enumerate(periods_days)
+            )
+        ).where(
+            DailyUserStats.day >= periods_days[-1],
+            *self._produce_referral_link_whereclauses(
+                DailyUserStats.referral_link_id, referral_link_id
+            ),
+        )
+
+        live_columns = []
+        for column in (User.created_at, User.bot_blocked_at):
+            live_columns.append(
+                select(
+                    *(
+                        func.count()
+                        .filter(
+                            column
+                            >= max(
+                                live_period_start,
+                                get_utc_start_of_client_side_day(period_day),
+                            )
+                        )
+                        .label(f"period_{index}")
+                        for index, period_day in enumerate(periods_days)
+                    )
+                )
+                .where(
+                    column >= live_period_start,
+                    *self._produce_referral_link_whereclauses(
+                        User.referral_link_id, referral_link_id
+                    ),
+                )
+                .subquery()
+            )
+
+        closed_days_subquery = closed_days.subquery()
+        registrations, blocks = live_columns
+
+        statement = select(
+            *(
+                closed_days_subquery.c[f"period_{index}"]
+                + registrations.c[f"period_{index}"]
+                - blocks.c[f"period_{index}"]
+                for index in range(len(periods_days))
+            )
+        )
+        data = await self._session.execute(statement)
+
+        return tuple(data.one())  # type: ignore[return-value]
+
+    async def get_game_players_stats(self) -> Tuple[int, int, int]:
+        closed_day, live_period_start = await self._get_live_period(DailyUserStats)
+
+        statement = select(
+            self._produce_closed_day_sum_statement(DailyUserStats.players, closed_day)
+            + self._produce_live_users_count_statement(
+                User.created_at, live_period_start, players_only=True
+            ),
+            self._produce_closed_day_sum_statement(DailyUserStats.inactive_players, closed_day)
+            + self._produce_live_users_count_statement(
+                User.bot_blocked_at, live_period_start, players_only=True
+            ),
+        )
+
+        total_players, inactive_players = (await self._session.execute(statement)).one()
+
+        return total_players, total_players - inactive_players, inactive_players
+
+    async def get_game_engagement_stats(self) -> Tuple[int, int, int]:
+        _, live_period_start = await self._get_live_period(DailyGameStats)
+        today_start = get_utc_start_of_client_side_day(get_client_side_date())
+        week_start_day = get_client_side_date() - datetime.timedelta(days=6)
+        week_start = max(live_period_start, get_utc_start_of_client_side_day(week_start_day))
+
+        closed_days = select(
+            cast(
+                func.coalesce(func.sum(DailyGameStats.games_played), 0),
+                BigInteger,
+            ).label("total_games"),
+            cast(
+                func.coalesce(
+                    func.sum(DailyGameStats.games_played).filter(
+                        DailyGameStats.day >= week_start_day
+                    ),
+                    0,
+                ),
+                BigInteger,
+            ).label("weekly_games"),
+        ).subquery()
+
+        # Only the partitions of the days not closed out yet are scanned
+        live = (
+            select(
+                func.count().label("total_games"),
+                func.count().filter(Game.created_at >= today_start).label("daily_games"),
+                func.count().filter(Game.created_at >= week_start).label("weekly_games"),
+            )
+            .where(Game.created_at >= live_period_start)
+            .subquery()
+        )
+
+        statement = select(
+            closed_days.c.total_games + live.c.total_games,
+            live.c.daily_games,
+            closed_days.c.weekly_games + live.c.weekly_games,
+        )
+        data = await self._session.execute(statement)
+
+        return tuple(data.one())  # type: ignore[return-value]
+
+    async def _get_live_period(
+        self, model: Type[DailyUserStats] | Type[DailyGameStats]
+    ) -> Tuple[datetime.date | None, datetime.datetime]:
+        closed_day = await self._session.scalar(select(func.max(model.day)))
+
+        # Everything is counted live until the first close-out or backfill
+        if closed_day is None:
+            return None, datetime.datetime.min
+
+        return closed_day, get_utc_start_of_client_side_day(
+            closed_day + datetime.timedelta(days=1)
+        )
+
+    @staticmethod
+    def _produce_client_side_day_statement(
+        column: ColumnElement[datetime.datetime],
+    ) -> ColumnElement[datetime.date]:
+        return cast(
+            func.timezone(CLIENT_SIDE_TIMEZONE, func.timezone("UTC", column)),
+            Date,
+        ).label("day")
+
+    @staticmethod
+    def _produce_referral_link_whereclauses(
+        column: ColumnElement[str | None],
+        referral_link_id: str | None,
+    ) -> List[ColumnElement[bool]]:
+        return [] if referral_link_id is None else [column == referral_link_id]
+
+    def _produce_closed_day_sum_statement(
+        self,
+        column: ColumnElement[int],
+        closed_day: datetime.date | None,
+        referral_link_id: str | None = None,
+    ) -> ScalarSelect[int]:
+        return (
+            select(cast(func.coalesce(func.sum(column), 0), BigInteger))
+            .where(
+                DailyUserStats.day == closed_day,
+                *self._produce_referral_link_whereclauses(
+                    DailyUserStats.referral_link_id, referral_link_id
+                ),
+            )
+            .scalar_subquery()
+        )
+
+    def _produce_live_users_count_statement(
+        self,
+        column: ColumnElement[datetime.datetime | None],
+        live_period_start: datetime.datetime,
+        referral_link_id: str | None = None,
+        players_only: bool = False,
+    ) -> ScalarSelect[int]:
+        statement = select(func.count()).where(
+            column >= live_period_start,
+            *self._produce_referral_link_whereclauses(User.referral_link_id, referral_link_id),
+        )
+        if players_only:
+            statement = statement.where(User.used_webapp.is_(True))
+
+        return statement.scalar_subquery()
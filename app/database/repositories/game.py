@@ -1,15 +1,31 @@
 import datetime
-from typing import Tuple
-
-from sqlalchemy import and_, select, func, distinct, FunctionFilter
+from typing import AsyncIterator, List, Sequence, Tuple
+
+from sqlalchemy import (
+    ARRAY,
+    UUID,
+    Boolean,
+    Float,
+    Row,
+    cast,
+    func,
+    literal,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import Game
 from app.database.repositories.base import BaseRepository
-from app.utils.dt import get_aware_end_of_day
 
 
 class GameRepository:
+    PARTITION_NAME_FORMAT = "games_y%Ym%m"
+    ARCHIVE_SCHEMA = "archive"
+
     def __init__(
         self,
         session: AsyncSession,
@@ -22,6 +38,28 @@ class GameRepository:
 
         return result
 
+    async def create_many(self, games: Sequence[Game]) -> None:
+        statement = (
+            insert(Game)
+            .values(
+                [
+                    {
+                        "id": game.id,
+                        "user_id": game.user_id,
+                        "score": game.score,
+                        "marked_as_suspicious": game.marked_as_suspicious,
+                        "on_fraud_check": game.on_fraud_check,
+                        "created_at": game.created_at,
+                        "finished_at": game.finished_at,
+                    }
+                    for game in games
+                ]
+            )
+            # A batch taken again after a failed or crashed flush may be persisted already
+            .on_conflict_do_nothing(index_elements=[Game.id, Game.created_at])
+        )
+        await self._session.execute(statement)
+
     async def get_by_id(self, model_id: str) -> Game:
         result = await self._repository.get_one(
             Game.id == model_id,
@@ -29,68 +67,152 @@ class GameRepository:
 
         return result
 
-    async def get_active_game(self, model_id: str, user_id: int) -> Game:
-        result = await self._repository.get_one(
-            whereclause=and_(
-                Game.id == model_id,
-                Game.user_id == user_id,
-                Game.finished_at.is_(None),
+    async def stream_pending_review(
+        self,
+        started_after: datetime.datetime,
+        history_started_after: datetime.datetime,
+        batch_size: int,
+    ) -> AsyncIterator[Sequence[Row[Tuple[str, int, float, int, int, float, float]]]]:
+        pending_users_ids = select(Game.user_id).where(
+            Game.created_at >= started_after,
+            Game.on_fraud_check.is_(True),
+            Game.finished_at.is_not(None),
+        )
+
+        # History is reduced to per-user score moments, so its size does not depend on games
+        history = (
+            select(
+                Game.user_id,
+                func.count().label("games_amount"),
+                cast(func.avg(Game.score), Float).label("score_mean"),
+                cast(func.stddev_pop(Game.score), Float).label("score_deviation"),
             )
+            .where(
+                Game.created_at >= history_started_after,
+                Game.on_fraud_check.is_not(True),
+                Game.finished_at.is_not(None),
+                Game.marked_as_suspicious.is_not(True),
+                Game.user_id.in_(pending_users_ids),
+            )
+            .group_by(Game.user_id)
+            .subquery()
         )
 
-        return result
+        # Games of the first hour started before the window still count towards its rate
+        window_games = (
+            select(
+                Game.id,
+                Game.user_id,
+                Game.score,
+                Game.created_at,
+                Game.finished_at,
+                Game.on_fraud_check,
+                func.count()
+                .over(partition_by=(Game.user_id, func.date_trunc("hour", Game.created_at)))
+                .label("games_per_hour"),
+            )
+            .where(
+                Game.created_at >= started_after.replace(minute=0, second=0, microsecond=0),
+                Game.finished_at.is_not(None),
+                Game.user_id.in_(pending_users_ids),
+            )
+            .subquery()
+        )
 
-    async def finish_game(self, game_id: str, score: int, marked_as_suspicious: bool) -> Game:
-        result = await self._repository.update_one(
-            whereclause=Game.id == game_id,
-            score=score,
-            marked_as_suspicious=marked_as_suspicious,
-            on_fraud_check=marked_as_suspicious,
-            finished_at=datetime.datetime.utcnow(),
+        statement = (
+            select(
+                window_games.c.id,
+                window_games.c.score,
+                cast(
+                    func.extract("epoch", window_games.c.finished_at - window_games.c.created_at),
+                    Float,
+                ),
+                window_games.c.games_per_hour,
+                func.coalesce(history.c.games_amount, 0),
+                func.coalesce(history.c.score_mean, 0),
+                func.coalesce(history.c.score_deviation, 0),
+            )
+            .outerjoin(history, history.c.user_id == window_games.c.user_id)
+            .where(
+                window_games.c.created_at >= started_after,
+                window_games.c.on_fraud_check.is_(True),
+            )
         )
 
-        return result
+        result = await self._session.stream(
+            statement.execution_options(yield_per=batch_size),
+        )
+        async for partition in result.partitions():
+            yield partition
 
-    async def get_games_in_progress_amount(self) -> int:
-        statement = select(func.count(Game.id))
-        games_in_progress_amount = await self._session.scalar(statement)
-
-        return games_in_progress_amount  # type: ignore[return-value]
-
-    async def get_game_engagement_stats(self) -> Tuple[int, int, int, int]:
-        today_end = get_aware_end_of_day()
-        today_start = today_end - datetime.timedelta(days=1)
-        week_ago = today_end - datetime.timedelta(days=7)
-
-        statement = select(
-            func.count(Game.id).label("total_games"),
-            self._produce_period_count_statement(
-                today_start,
-                today_end,
-                count_unique_games=True,
-            ).label("daily_unique_players"),
-            self._produce_period_count_statement(
-                today_start,
-                today_end,
-            ).label("daily_games_played"),
-            self._produce_period_count_statement(
-                week_ago,
-                today_end,
-            ).label("weekly_games_played"),
+    async def apply_fraud_verdicts(
+        self,
+        game_ids: Sequence[str],
+        verdicts: Sequence[bool],
+        started_after: datetime.datetime,
+    ) -> None:
+        reviewed = (
+            func.unnest(
+                literal(list(game_ids), ARRAY(UUID(as_uuid=False))),
+                literal(list(verdicts), ARRAY(Boolean)),
+            )
+            .table_valued("id", "is_suspicious")
+            .render_derived(name="reviewed")
         )
 
-        data = await self._session.execute(statement)
-        return tuple(data.one())  # type: ignore[return-value]
+        # Lower bound of created_at lets the planner skip partitions outside the review window
+        statement = (
+            update(Game)
+            .where(
+                Game.id == reviewed.c.id,
+                Game.created_at >= started_after,
+            )
+            .values(
+                # The review only adds flags, verdicts of the checks on finish are never cleared
+                marked_as_suspicious=or_(
+                    func.coalesce(Game.marked_as_suspicious, False),
+                    reviewed.c.is_suspicious,
+                ),
+                on_fraud_check=False,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.execute(statement)
 
-    def _produce_period_count_statement(
-        self,
-        period_start: datetime.datetime,
-        period_end: datetime.datetime,
-        count_unique_games: bool = False,
-    ) -> FunctionFilter[int]:
-        field = Game.id
+    async def get_partitions_months(self) -> List[datetime.date]:
+        statement = text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+        )
+        partitions_names = await self._session.scalars(
+            statement,
+            {"parent": Game.__tablename__},
+        )
+
+        return [
+            datetime.datetime.strptime(partition_name, self.PARTITION_NAME_FORMAT).date()
+            for partition_name in partitions_names
+        ]
+
+    async def create_partition(self, month: datetime.date) -> None:
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+        await self._session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {month.strftime(self.PARTITION_NAME_FORMAT)} "
+                f"PARTITION OF {Game.__tablename__} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+        )
 
-        if count_unique_games:
-            field = distinct(Game.user_id)  # type: ignore[assignment]
+    async def archive_partition(self, month: datetime.date) -> None:
+        partition_name = month.strftime(self.PARTITION_NAME_FORMAT)
 
-        return func.count(field).filter(Game.created_at.between(period_start, period_end))
+        # Detached partition becomes a regular table, which is kept aside from the live data
+        await self._session.execute(
+            text(f"ALTER TABLE {Game.__tablename__} DETACH PARTITION {partition_name}")
+        )
+        await self._session.execute(
+            text(f"ALTER TABLE {partition_name} SET SCHEMA {self.ARCHIVE_SCHEMA}")
+        )
@@ -0,0 +1,39 @@
+from sqlalchemy import BigInteger, SmallInteger, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import ReferralAncestor
+from app.database.repositories.base import BaseRepository
+from app.typings.consts import REFERRAL_SYSTEM_MAX_LEVEL
+
+
+class ReferralAncestorRepository:
+    def __init__(
+        self,
+        session: AsyncSession,
+    ):
+        self._session = session
+        self._repository = BaseRepository(ReferralAncestor, session)
+
+    async def add_referral(self, user_id: int, referrer_id: int) -> None:
+        # The referrer becomes the first level, its own ancestors are shifted one level down
+        referrer_ancestors = select(
+            literal(user_id, BigInteger),
+            ReferralAncestor.ancestor_id,
+            ReferralAncestor.level + 1,
+        ).where(
+            ReferralAncestor.user_id == referrer_id,
+            ReferralAncestor.level < REFERRAL_SYSTEM_MAX_LEVEL,
+        )
+
+        statement = insert(ReferralAncestor).from_select(
+            ["user_id", "ancestor_id", "level"],
+            union_all(
+                select(
+                    literal(user_id, BigInteger),
+                    literal(referrer_id, BigInteger),
+                    literal(1, SmallInteger),
+                ),
+                referrer_ancestors,
+            ),
+        )
+        await self._session.execute(statement)
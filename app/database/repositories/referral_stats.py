@@ -0,0 +1,90 @@
+from typing import Sequence
+
+from sqlalchemy import BigInteger, delete, exists, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import ReferralAncestor, ReferralStats, User
+from app.database.repositories.base import BaseRepository
+
+
+class ReferralStatsRepository:
+    def __init__(
+        self,
+        session: AsyncSession,
+    ):
+        self._session = session
+        self._repository = BaseRepository(ReferralStats, session)
+
+    async def get_by_user_id(self, user_id: int) -> Sequence[ReferralStats]:
+        statement = (
+            select(ReferralStats)
+            .where(ReferralStats.user_id == user_id)
+            .order_by(ReferralStats.level)
+        )
+        result = await self._session.scalars(statement)
+
+        return result.all()
+
+    async def add_referral(self, user_id: int, registration_bonus: int) -> None:
+        # Must run after the user's referral_ancestors rows are inserted
+        statement = insert(ReferralStats).from_select(
+            ["user_id", "level", "referrals_amount", "referrals_profit"],
+            select(
+                ReferralAncestor.ancestor_id,
+                ReferralAncestor.level,
+                literal(1, BigInteger),
+                literal(registration_bonus, BigInteger),
+            ).where(ReferralAncestor.user_id == user_id),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ReferralStats.user_id, ReferralStats.level],
+            set_={
+                "referrals_amount": ReferralStats.referrals_amount
+                + statement.excluded.referrals_amount,
+                "referrals_profit": ReferralStats.referrals_profit
+                + statement.excluded.referrals_profit,
+            },
+        )
+        await self._session.execute(statement)
+
+    async def rebuild(self) -> None:
+        actual_stats = (
+            select(
+                ReferralAncestor.ancestor_id,
+                ReferralAncestor.level,
+                func.count(User.id),
+                func.coalesce(func.sum(User.referral_registration_bonus), 0),
+            )
+            .join(User, User.id == ReferralAncestor.user_id)
+            .group_by(ReferralAncestor.ancestor_id, ReferralAncestor.level)
+        )
+
+        upsert_statement = insert(ReferralStats).from_select(
+            ["user_id", "level", "referrals_amount", "referrals_profit"],
+            actual_stats,
+        )
+        excluded = upsert_statement.excluded
+        upsert_statement = upsert_statement.on_conflict_do_update(
+            index_elements=[ReferralStats.user_id, ReferralStats.level],
+            set_={
+                "referrals_amount": excluded.referrals_amount,
+                "referrals_profit": excluded.referrals_profit,
+            },
+            # Only drifted rows are rewritten
+            where=tuple_(
+                ReferralStats.referrals_amount,
+                ReferralStats.referrals_profit,
+            ).is_distinct_from(tuple_(excluded.referrals_amount, excluded.referrals_profit)),
+        )
+        await self._session.execute(upsert_statement)
+
+        # Levels left without referrals, e.g. after referrals were deleted
+        await self._session.execute(
+            delete(ReferralStats).where(
+                ~exists().where(
+                    ReferralAncestor.ancestor_id == ReferralStats.user_id,
+                    ReferralAncestor.level == ReferralStats.level,
+                )
+            )
+        )
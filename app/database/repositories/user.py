@@ -1,42 +1,77 @@
-from datetime import datetime, timedelta
-from typing import Sequence, Any, Tuple, List
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from typing import Sequence, Tuple, List, Mapping, AsyncIterator
 
 from sqlalchemy import (
     select,
+    delete,
     func,
     Row,
     literal,
-    String,
     and_,
+    or_,
+    tuple_,
     update,
     case,
     cast,
     ColumnElement,
+    Insert,
+    BigInteger,
+    DateTime,
+    Double,
+    CTE,
+    ScalarSelect,
+    union_all,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, INTERVAL, insert
+from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.database.models import User, DailyReward
+from sqlalchemy.orm import aliased
+
+from app.database.models import (
+    User,
+    DailyReward,
+    ReferralAncestor,
+    ReferralLink,
+    ReferralReward,
+    UserScoreStats,
+)
 from app.database.repositories.base import BaseRepository
-from app.exceptions.database import DBActionNotAllowedError
+from app.database.uow.sqlalchemy import add_after_commit_callback
+from app.exceptions.database import DBActionNotAllowedError, RecordNotFoundError
+from app.services.leaderboard import Leaderboard
+from app.services.user_cache import UserCache
 from app.typings.consts import (
-    DAILY_GAME_ENERGY_AMOUNT,
-    REFERRAL_SYSTEM_MAX_LEVEL,
     REFERRAL_SYSTEM_PROFIT_PERCENT,
-    RANKING_PLACE_LIMIT,
-    RANKING_CHUNK_SIZE,
-    ADMIN_STATS_PLOT_DAYS_AMOUNT,
+    RANKING_FIELDS,
+    DAILY_RANKING_FIELDS,
+    CLIENT_SIDE_TIMEZONE,
+    STATS_PLOT_GRANULARITY_INTERVALS,
+    FRAUD_MAX_GAMES_PER_HOUR,
+    FRAUD_MIN_HISTORY_GAMES,
+    FRAUD_RATE_WINDOW_SECONDS,
+    FRAUD_SCORE_Z_SCORE_THRESHOLD,
 )
 from app.typings.enums import UserFarmingStatus
-from app.utils.dt import get_aware_end_of_day
+from app.typings.literals import StatsPlotGranularityLiteral
+from app.utils.dt import (
+    get_daily_epoch,
+    get_utc_start_of_client_side_day,
+)
+from app.utils.ranking import get_ranking_score_attribute
 
 
 class UserRepository:
     def __init__(
         self,
         session: AsyncSession,
+        user_cache: UserCache | None = None,
+        leaderboard: Leaderboard | None = None,
     ):
         self._session = session
         self._repository = BaseRepository(User, session)
+        self._user_cache = user_cache
+        self._leaderboard = leaderboard
 
     async def get_by_id(self, model_id: int) -> User:
         result = await self._repository.get_one(
@@ -58,6 +93,7 @@ class UserRepository:
 
     async def create(self, user: User) -> User:
         result = await self._repository.create_one(user)
+        self._sync_leaderboard(result)
 
         return result
 
@@ -67,6 +103,8 @@ class UserRepository:
         **kwargs,
     ) -> User:
         result = await self._repository.update_one(whereclause=User.id == model_id, **kwargs)
+        self._invalidate_cache(model_id)
+        self._sync_leaderboard(result)
 
         return result
 
@@ -79,11 +117,13 @@ class UserRepository:
             whereclause=User.id == model_id,
             referral_balance=User.referral_balance + amount,
         )
+        self._invalidate_cache(model_id)
 
         return result
 
     async def delete_one_by_id(self, model_id: int) -> User:
         result = await self._repository.delete_one(whereclause=User.id == model_id)
+        self._invalidate_cache(model_id)
 
         return result
 
@@ -97,6 +137,7 @@ class UserRepository:
             whereclause=User.id == model_id,
             farming_started_at=datetime.utcnow(),
         )
+        self._invalidate_cache(model_id)
 
         return result
 
@@ -110,339 +151,537 @@ class UserRepository:
             whereclause=User.id == model_id,
             farming_started_at=None,
             balance=User.balance + User.farming_total_profit,
-            daily_overall_profit=User.daily_overall_profit + User.farming_total_profit,
+            **User.roll_daily_counters(
+                daily_overall_profit=User.current_daily_overall_profit + User.farming_total_profit,
+            ),
         )
+        self._invalidate_cache(model_id)
+        self._sync_leaderboard(result)
 
         return result
 
-    async def reset_game_energy(self) -> None:
-        await self._repository.update_many(
-            whereclause=User.game_energy < DAILY_GAME_ENERGY_AMOUNT,
-            game_energy=DAILY_GAME_ENERGY_AMOUNT,
+    async def backfill_referral_columns_batch(self, after_id: int, batch_size: int) -> int | None:
+        batch_ids = (
+            select(User.id).where(User.id > after_id).order_by(User.id).limit(batch_size).subquery()
         )
+        last_id = await self._session.scalar(select(func.max(batch_ids.c.id)))
 
-    async def reset_daily_highscore(self) -> None:
-        await self._repository.update_many(
-            whereclause=User.game_daily_highscore > 0,
-            game_daily_highscore=0,
+        if last_id is None:
+            return None
+
+        batch_clause = and_(User.id > after_id, User.id <= last_id)
+        referrers = aliased(User, name="referrers")
+        referrer_source_id = case(
+            (User.source.regexp_match(r"^[0-9]{1,18}$"), cast(User.source, BigInteger)),
         )
 
-    async def reset_daily_overall_profit(self) -> None:
-        await self._repository.update_many(
-            whereclause=User.daily_overall_profit > 0,
-            daily_overall_profit=0,
+        await self._session.execute(
+            update(User)
+            .where(
+                batch_clause,
+                User.referrer_id.is_(None),
+                referrers.id == referrer_source_id,
+            )
+            .values(referrer_id=referrers.id)
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.execute(
+            update(User)
+            .where(
+                batch_clause,
+                User.referral_link_id.is_(None),
+                ReferralLink.id == User.source,
+            )
+            .values(referral_link_id=ReferralLink.id)
+            .execution_options(synchronize_session=False)
         )
 
+        return last_id
+
     async def claim_reward(self, user_id: int, reward: DailyReward) -> User:
         user = await self._repository.update_one(
             whereclause=User.id == user_id,
             balance=User.balance + reward.reward_amount,
-            daily_overall_profit=User.daily_overall_profit + reward.reward_amount,
+            **User.roll_daily_counters(
+                daily_overall_profit=User.current_daily_overall_profit + reward.reward_amount,
+            ),
         )
+        self._invalidate_cache(user_id)
+        self._sync_leaderboard(user)
 
         return user
 
     async def reward_user_referrers(self, user_id: int, initial_profit: int) -> None:
-        tree_recursive_cte = (
-            select(
-                User.id,
-                User.source,
-                User.balance,
-                literal(0).label("level"),
-            )
-            .where(User.id == user_id)
-            .cte(name="tree", recursive=True)
-        )
+        statement = self._produce_referral_rewards_statement(user_id, initial_profit)
 
-        tree_recursive_cte = tree_recursive_cte.union_all(
-            select(
-                User.id,
-                User.source,
-                User.balance,
-                (tree_recursive_cte.c.level + 1).label("level"),
-            ).where(
-                and_(
-                    cast(User.id, String) == tree_recursive_cte.c.source,
-                    tree_recursive_cte.c.level + 1 <= REFERRAL_SYSTEM_MAX_LEVEL,
-                )
-            )
-        )
+        if statement is not None:
+            await self._session.execute(statement)
 
-        update_statement = (
-            update(User)
+    async def settle_referral_rewards(self, batch_size: int) -> Sequence[int]:
+        settled_rewards = (
+            delete(ReferralReward)
             .where(
-                and_(
-                    User.id == tree_recursive_cte.c.id,
-                    tree_recursive_cte.c.level > 0,
-                ),
-            )
-            .values(
-                referral_balance=case(
-                    *[
-                        (
-                            tree_recursive_cte.c.level == level,
-                            User.referral_balance + initial_profit * percent // 100,
-                        )
-                        for level, percent in list(REFERRAL_SYSTEM_PROFIT_PERCENT.items())
-                    ],
+                ReferralReward.id.in_(
+                    select(ReferralReward.id)
+                    .order_by(ReferralReward.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
                 )
             )
+            .returning(ReferralReward.referrer_id, ReferralReward.amount)
+            .cte("settled_rewards")
         )
-        await self._session.execute(update_statement)
-        await self._session.commit()
-
-    async def get_referrals_stats(self, model_id: int) -> Sequence[Row[tuple[int, Any, Any]]]:
-        tree_cte = (
-            select(
-                User.id.label("id"),
-                User.referral_registration_bonus.label("referral_registration_bonus"),
-                User.source.label("source"),
-                literal(value=0).label("level"),
-            )
-            .where(User.id == model_id)
-            .cte(name="tree", recursive=True)
-        )
-
-        tree_recursive = tree_cte.union_all(
+        referrers_profit = (
             select(
-                User.id,
-                User.referral_registration_bonus,
-                User.source,
-                (tree_cte.c.level + 1).label("level"),
+                settled_rewards.c.referrer_id,
+                func.sum(settled_rewards.c.amount).label("amount"),
             )
-            .join(tree_cte, cast(tree_cte.c.id, String) == User.source)  # type: ignore[name-defined]
-            .where((tree_cte.c.level + 1) <= REFERRAL_SYSTEM_MAX_LEVEL)
+            .group_by(settled_rewards.c.referrer_id)
+            .cte("referrers_profit")
         )
 
-        result = await self._session.execute(
-            select(
-                func.count(tree_recursive.c.id).label("referrals_amount"),
-                func.sum(tree_recursive.c.referral_registration_bonus).label("referrals_profit"),
-                tree_recursive.c.level.label("level"),
-            )
-            .where(tree_recursive.c.level > 0)
-            .group_by(tree_recursive.c.level)
+        statement = (
+            update(User)
+            .add_cte(settled_rewards)
+            .where(User.id == referrers_profit.c.referrer_id)
+            .values(referral_balance=User.referral_balance + referrers_profit.c.amount)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
         )
+        settled_ids = (await self._session.scalars(statement)).all()
+        self._invalidate_cache(*settled_ids)
 
-        return result.all()
+        return settled_ids
 
     async def claim_referrals_profit(
         self,
         model_id: int,
     ) -> User:
-        result = await self._repository.update_one(
-            whereclause=User.id == model_id,
-            balance=User.balance + User.referral_balance,
-            daily_overall_profit=User.daily_overall_profit + User.referral_balance,
-            referral_balance=0,
+        # Pending ledger entries are settled in the same statement, so no reward is lost
+        pending_rewards = (
+            delete(ReferralReward)
+            .where(ReferralReward.referrer_id == model_id)
+            .returning(ReferralReward.amount)
+            .cte("pending_rewards")
+        )
+        referral_profit = (
+            User.referral_balance
+            + select(func.coalesce(func.sum(pending_rewards.c.amount), 0)).scalar_subquery()
         )
-        return result
 
-    async def renew_last_activity_at(
-        self,
-        model_id: int,
-    ) -> User:
-        result = await self._repository.update_one(
-            whereclause=User.id == model_id,
-            last_activity_at=datetime.utcnow(),
+        statement = (
+            update(User)
+            .add_cte(pending_rewards)
+            .where(User.id == model_id)
+            .values(
+                balance=User.balance + referral_profit,
+                referral_balance=0,
+                **User.roll_daily_counters(
+                    daily_overall_profit=User.current_daily_overall_profit + referral_profit,
+                ),
+            )
+            .returning(User)
         )
 
+        try:
+            result = (await self._session.execute(statement)).scalar_one()
+        except NoResultFound:
+            raise RecordNotFoundError(User.__name__)
+
+        self._invalidate_cache(model_id)
+        self._sync_leaderboard(result)
+
         return result
 
-    async def get_user_ranking_info(
+    async def renew_last_activity_at_many(
         self,
-        model_id: int,
-        ranking_field: str,
-    ) -> Tuple[int, int]:
-        target_user = await self.get_by_id(model_id)
-        ranking_value = getattr(target_user, ranking_field)
+        activities: Mapping[int, datetime],
+    ) -> None:
+        activity = (
+            func.unnest(
+                literal(list(activities.keys()), ARRAY(BigInteger)),
+                literal(list(activities.values()), ARRAY(DateTime)),
+            )
+            .table_valued("id", "seen_at")
+            .render_derived(name="activity")
+        )
 
-        ranking_place_subq = (
-            select(User.id)
+        # Snapshot cache is not invalidated here: last_activity_at is never served from it
+        statement = (
+            update(User)
             .where(
                 and_(
-                    getattr(User, ranking_field) >= ranking_value,
-                    User.id != target_user.id,
+                    User.id == activity.c.id,
+                    User.last_activity_at < activity.c.seen_at,
                 )
             )
-            .limit(RANKING_PLACE_LIMIT - 1)
-        ).subquery()
+            .values(last_activity_at=activity.c.seen_at)
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.execute(statement)
 
-        ranking_place_statement = select(func.count("*")).select_from(ranking_place_subq)
+    async def get_ranking_page(
+        self,
+        ranking_field: str,
+        limit: int,
+        after: Tuple[int, str, int] | None = None,
+    ) -> Sequence[Row[Tuple[int, str, str | None, int]]]:
+        ranking_column = getattr(User, ranking_field)
+
+        statement = (
+            select(User.id, User.first_name, User.last_name, ranking_column.label("score"))
+            .order_by(ranking_column.desc(), User.first_name, User.id)
+            .limit(limit)
+        )
 
-        ranking_place = await self._session.scalar(ranking_place_statement)
+        if ranking_field in DAILY_RANKING_FIELDS:
+            statement = statement.where(User.daily_epoch == get_daily_epoch())
 
-        if ranking_place is None:
-            ranking_place = 1
-        else:
-            ranking_place += 1
+        if after is not None:
+            after_score, after_first_name, after_id = after
+            statement = statement.where(
+                and_(
+                    ranking_column <= after_score,
+                    or_(
+                        ranking_column < after_score,
+                        tuple_(User.first_name, User.id) > tuple_(after_first_name, after_id),
+                    ),
+                )
+            )
 
-        return ranking_place, ranking_value
+        result = await self._session.execute(statement)
+        return result.all()
 
-    async def get_ranking_chunk(
+    async def stream_ranking_scores(
         self,
-        ranking_field: str,
-        offset: int,
-    ) -> Sequence[User]:
-        statement = (
-            select(User)
-            .order_by(getattr(User, ranking_field).desc(), User.first_name, User.last_name)
-            .offset(offset)
-            .limit(RANKING_CHUNK_SIZE)
+        batch_size: int,
+    ) -> AsyncIterator[Sequence[Row[Tuple[int, int, int, int, int]]]]:
+        statement = select(
+            User.id,
+            *[
+                getattr(User, score_attribute).label(score_attribute)
+                for score_attribute in map(get_ranking_score_attribute, RANKING_FIELDS)
+            ],
         )
 
-        result = await self._session.scalars(statement)
-        return result.all()
+        result = await self._session.stream(
+            statement.execution_options(yield_per=batch_size),
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def get_users_amount(self) -> int:
+        return await self._session.scalar(select(func.count(User.id)))  # type: ignore[return-value]
+
+    async def stream_blocked_ids(self, batch_size: int) -> AsyncIterator[Sequence[int]]:
+        statement = select(User.id).where(User.bot_blocked_at.is_not(None))
+
+        result = await self._session.stream_scalars(
+            statement.execution_options(yield_per=batch_size),
+        )
+        async for partition in result.partitions():
+            yield partition
 
     async def decrement_game_energy(
         self,
         model_id: int,
     ) -> User:
-        user = await self._repository.update_one(
-            whereclause=User.id == model_id,
-            game_energy=User.game_energy - 1,
+        # The snapshot the caller checked may be stale, so the energy is checked once more here
+        statement = (
+            update(User)
+            .where(User.id == model_id, User.current_game_energy > 0)
+            .values(**User.roll_daily_counters(game_energy=User.current_game_energy - 1))
+            .returning(User)
         )
+
+        try:
+            user = (await self._session.execute(statement)).scalar_one()
+        except NoResultFound:
+            raise DBActionNotAllowedError(User.__name__)
+
+        self._invalidate_cache(model_id)
+
         return user
 
-    async def update_highscores(
+    async def finish_game(
         self,
-        update_daily_highscore: bool,
-        update_alltime_highscore: bool,
         user_id: int,
         score: int,
-    ) -> User:
-        extra_values = {}
-
-        if update_daily_highscore:
-            extra_values["game_daily_highscore"] = score
-        if update_alltime_highscore:
-            extra_values["game_alltime_highscore"] = score
+        score_is_suspicious: bool,
+    ) -> Tuple[User, bool]:
+        finished_at = datetime.utcnow()
+
+        # The player's baseline is checked within the statement, so finishing needs no reads
+        verdict = select(
+            or_(
+                literal(score_is_suspicious),
+                func.coalesce(
+                    self._produce_baseline_deviation_statement(user_id, score, finished_at),
+                    False,
+                ),
+            ).label("marked_as_suspicious")
+        ).cte("verdict")
 
-        user = await self._repository.update_one(
-            whereclause=User.id == user_id,
-            balance=User.balance + score,
-            daily_overall_profit=User.daily_overall_profit + score,
-            **extra_values,
+        statement = (
+            update(User)
+            .add_cte(verdict)
+            .where(User.id == user_id)
+            .values(
+                balance=User.balance + score,
+                game_alltime_highscore=func.greatest(User.game_alltime_highscore, score),
+                **User.roll_daily_counters(
+                    daily_overall_profit=User.current_daily_overall_profit + score,
+                    game_daily_highscore=func.greatest(User.current_game_daily_highscore, score),
+                ),
+            )
+            .returning(User, select(verdict.c.marked_as_suspicious).scalar_subquery())
         )
-        return user
 
-    async def get_users_amount_stats(
-        self, referral_source: str | None = None
-    ) -> Tuple[int, int, int]:
-        statement = select(
-            func.count(User.id).label("total_users"),
-            func.count(User.id).filter(User.bot_blocked_at.is_(None)).label("active_users"),
-            func.count(User.id).filter(User.bot_blocked_at.isnot(None)).label("inactive_users"),
+        # Score stats and ledger entries are written within the same statement
+        statement = statement.add_cte(
+            self._produce_score_stats_statement(user_id, score, finished_at, verdict).cte(
+                "score_stats"
+            )
         )
+        referral_rewards = self._produce_referral_rewards_statement(user_id, score)
+        if referral_rewards is not None:
+            statement = statement.add_cte(referral_rewards.cte("referral_rewards"))
 
-        if referral_source is not None:
-            statement = statement.where(User.source == referral_source)
+        try:
+            user, marked_as_suspicious = (await self._session.execute(statement)).one()
+        except NoResultFound:
+            raise RecordNotFoundError(User.__name__)
 
-        data = await self._session.execute(statement)
+        self._invalidate_cache(user_id)
+        self._sync_leaderboard(user)
 
-        return tuple(data.one())  # type: ignore[return-value]
+        return user, marked_as_suspicious
 
-    async def get_game_players_stats(self) -> Tuple[int, int, int, int]:
-        online_cright = datetime.utcnow()
-        online_cleft = online_cright - timedelta(minutes=5)
+    async def get_data_for_stats_plot(
+        self,
+        period_start: date,
+        period_end: date,
+        granularity: StatsPlotGranularityLiteral,
+        referral_link_id: str | None = None,
+    ) -> Tuple[List[datetime], List[int], List[int], List[int]]:
+        period_start_utc = get_utc_start_of_client_side_day(period_start)
+        period_end_utc = get_utc_start_of_client_side_day(period_end + timedelta(days=1))
+        # Typed referral columns, the same ones the users without source are told apart by
+        source_whereclauses = (
+            [] if referral_link_id is None else [User.referral_link_id == referral_link_id]
+        )
 
-        statement = select(
-            func.count(User.id).label("total_players"),
-            func.count(User.id).filter(User.bot_blocked_at.is_(None)).label("active_players"),
-            func.count(User.id).filter(User.bot_blocked_at.isnot(None)).label("inactive_players"),
-            func.count(User.id)
-            .filter(User.last_activity_at.between(online_cleft, online_cright))
-            .label("online"),
-        ).where(User.used_webapp.is_(True))
-
-        data = await self._session.execute(statement)
-
-        return tuple(data.one())  # type: ignore[return-value]
-
-    async def get_users_dynamic_stats(
-        self, referral_source: str | None = None
-    ) -> Tuple[int, int, int]:
-        today_end = get_aware_end_of_day()
-        today_start = today_end - timedelta(days=1)
-        week_ago = today_end - timedelta(days=7)
-        month_ago = today_end - timedelta(days=30)
+        # Buckets are aligned to the client side calendar, timestamps are stored in naive UTC
+        def bucket_of(column: ColumnElement[datetime]) -> ColumnElement[datetime]:
+            return func.date_trunc(
+                granularity,
+                func.timezone(CLIENT_SIDE_TIMEZONE, func.timezone("UTC", column)),
+            ).label("bucket")
 
-        statement = select(
-            self._produce_users_dynamic_count_statement(
-                today_start,
-                today_end,
-            ).label("daily_dynamic"),
-            self._produce_users_dynamic_count_statement(
-                week_ago,
-                today_end,
-            ).label("weekly_dynamic"),
-            self._produce_users_dynamic_count_statement(
-                month_ago,
-                today_end,
-            ).label("monthly_dynamic"),
-        )
+        new_users_bucket = bucket_of(User.created_at)
+        blocked_users_bucket = bucket_of(User.bot_blocked_at)
+
+        # Registrations and blocks are bucketed by different timestamps, so they are grouped
+        # separately and the already tiny union is spread over the buckets series
+        events = union_all(
+            select(
+                new_users_bucket,
+                func.count().label("new_users"),
+                literal(0).label("blocked_users"),
+                func.count()
+                .filter(and_(User.referrer_id.is_(None), User.referral_link_id.is_(None)))
+                .label("users_without_source"),
+            )
+            .where(
+                User.created_at >= period_start_utc,
+                User.created_at < period_end_utc,
+                *source_whereclauses,
+            )
+            .group_by(new_users_bucket),
+            select(
+                blocked_users_bucket,
+                literal(0),
+                func.count(),
+                literal(0),
+            )
+            .where(
+                User.bot_blocked_at >= period_start_utc,
+                User.bot_blocked_at < period_end_utc,
+                *source_whereclauses,
+            )
+            .group_by(blocked_users_bucket),
+        ).subquery()
 
-        if referral_source is not None:
-            statement = statement.where(User.source == referral_source)
+        buckets = (
+            func.generate_series(
+                func.date_trunc(granularity, literal(datetime.combine(period_start, time.min))),
+                func.date_trunc(granularity, literal(datetime.combine(period_end, time.max))),
+                literal(STATS_PLOT_GRANULARITY_INTERVALS[granularity], INTERVAL),
+            )
+            .table_valued("bucket")
+            .render_derived()
+        )
 
-        data = await self._session.execute(statement)
+        statement = (
+            select(
+                buckets.c.bucket,
+                *(
+                    cast(func.coalesce(func.sum(column), 0), BigInteger)
+                    for column in (
+                        events.c.new_users,
+                        events.c.blocked_users,
+                        events.c.users_without_source,
+                    )
+                ),
+            )
+            .select_from(buckets)
+            .outerjoin(events, events.c.bucket == buckets.c.bucket)
+            .group_by(buckets.c.bucket)
+            .order_by(buckets.c.bucket)
+        )
 
-        return tuple(data.one())  # type: ignore[return-value]
+        rows = (await self._session.execute(statement)).all()
 
-    async def get_data_for_stats_plot(self) -> Tuple[List[int], List[int], List[int]]:
-        new_users_data: List[int] = []
-        blocked_users_data: List[int] = []
-        new_users_without_source_data: List[int] = []
+        return (
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            [row[2] for row in rows],
+            [row[3] for row in rows],
+        )
 
-        stats_period_start = get_aware_end_of_day(days_offset=ADMIN_STATS_PLOT_DAYS_AMOUNT - 1)
+    def _produce_referral_rewards_statement(
+        self,
+        user_id: int,
+        initial_profit: int,
+    ) -> Insert | None:
+        level_amounts = {
+            level: int(initial_profit * percent // 100)
+            for level, percent in REFERRAL_SYSTEM_PROFIT_PERCENT.items()
+        }
+        level_amounts = {level: amount for level, amount in level_amounts.items() if amount > 0}
+
+        if not level_amounts:
+            return None
+
+        # Rewards are appended to the ledger, referrers' rows are only touched on settlement
+        return insert(ReferralReward).from_select(
+            ["referrer_id", "amount"],
+            select(
+                ReferralAncestor.ancestor_id,
+                case(
+                    *[
+                        (ReferralAncestor.level == level, amount)
+                        for level, amount in level_amounts.items()
+                    ],
+                ),
+            ).where(
+                ReferralAncestor.user_id == user_id,
+                ReferralAncestor.level.in_(level_amounts.keys()),
+            ),
+        )
 
-        for days_offset in range(ADMIN_STATS_PLOT_DAYS_AMOUNT):
-            cright = stats_period_start + timedelta(days=days_offset)
-            cleft = cright - timedelta(days=1)
+    def _produce_baseline_deviation_statement(
+        self,
+        user_id: int,
+        score: int,
+        finished_at: datetime,
+    ) -> ScalarSelect[bool]:
+        score_deviation = func.nullif(
+            func.sqrt(
+                UserScoreStats.score_m2 / func.nullif(UserScoreStats.games_amount, 0, type_=Double)
+            ),
+            0,
+            type_=Double,
+        )
 
-            new_users_amount_statement = select(func.count()).where(
-                User.created_at.between(cleft, cright)
-            )
-            new_users_without_source_amount_statement = new_users_amount_statement.where(
-                User.source.is_(None)
-            )
-            blocked_users_amount_statement = select(func.count()).where(
-                and_(
-                    User.bot_blocked_at.is_not(None),
-                    User.bot_blocked_at.between(
-                        cleft,
-                        cright,
+        return (
+            select(
+                or_(
+                    and_(
+                        UserScoreStats.games_amount >= FRAUD_MIN_HISTORY_GAMES,
+                        (score - UserScoreStats.score_mean) / score_deviation
+                        > FRAUD_SCORE_Z_SCORE_THRESHOLD,
+                    ),
+                    and_(
+                        UserScoreStats.window_started_at
+                        > finished_at - timedelta(seconds=FRAUD_RATE_WINDOW_SECONDS),
+                        UserScoreStats.window_games_amount >= FRAUD_MAX_GAMES_PER_HOUR,
                     ),
                 )
             )
+            .where(UserScoreStats.user_id == user_id)
+            .scalar_subquery()
+        )
 
-            for statement, data_array in zip(
-                [
-                    new_users_amount_statement,
-                    blocked_users_amount_statement,
-                    new_users_without_source_amount_statement,
-                ],
-                [
-                    new_users_data,
-                    blocked_users_data,
-                    new_users_without_source_data,
-                ],
-            ):
-                data = await self._session.scalar(statement)
-                data_array.append(data)  # type: ignore[arg-type]
-
-        return new_users_data, blocked_users_data, new_users_without_source_data
-
-    def _produce_users_dynamic_count_statement(
+    def _produce_score_stats_statement(
         self,
-        period_start: datetime,
-        period_end: datetime,
-    ) -> ColumnElement[int]:
-        return func.count(User.id).filter(
-            User.created_at.between(period_start, period_end),
-        ) - func.count(User.id).filter(
-            and_(
-                User.bot_blocked_at.between(period_start, period_end),
-                User.bot_blocked_at.isnot(None),
-            )
+        user_id: int,
+        score: int,
+        finished_at: datetime,
+        verdict: CTE,
+    ) -> Insert:
+        window_is_active = UserScoreStats.window_started_at > finished_at - timedelta(
+            seconds=FRAUD_RATE_WINDOW_SECONDS
+        )
+        is_suspicious = verdict.c.marked_as_suspicious
+
+        # Suspicious games only advance the rate window and are kept out of the baseline
+        statement = insert(UserScoreStats).from_select(
+            [
+                "user_id",
+                "games_amount",
+                "score_mean",
+                "score_m2",
+                "score_max",
+                "window_started_at",
+                "window_games_amount",
+            ],
+            select(
+                literal(user_id, BigInteger),
+                case((is_suspicious, 0), else_=1),
+                case((is_suspicious, 0), else_=score),
+                literal(0, Double),
+                case((is_suspicious, 0), else_=score),
+                literal(finished_at, DateTime),
+                literal(1),
+            ).select_from(verdict),
+        )
+        excluded = statement.excluded
+
+        # Welford's update: the baseline is maintained in O(1) without reading games history
+        games_amount = UserScoreStats.games_amount + 1
+        delta = score - UserScoreStats.score_mean
+        score_mean = UserScoreStats.score_mean + delta / cast(games_amount, Double)
+        is_counted = excluded.games_amount > 0
+
+        return statement.on_conflict_do_update(
+            index_elements=[UserScoreStats.user_id],
+            set_={
+                "games_amount": UserScoreStats.games_amount + excluded.games_amount,
+                "score_mean": case((is_counted, score_mean), else_=UserScoreStats.score_mean),
+                "score_m2": case(
+                    (is_counted, UserScoreStats.score_m2 + delta * (score - score_mean)),
+                    else_=UserScoreStats.score_m2,
+                ),
+                "score_max": func.greatest(UserScoreStats.score_max, excluded.score_max),
+                "window_started_at": case(
+                    (window_is_active, UserScoreStats.window_started_at),
+                    else_=finished_at,
+                ),
+                "window_games_amount": case(
+                    (window_is_active, UserScoreStats.window_games_amount + 1),
+                    else_=1,
+                ),
+                "updated_at": func.timezone("utc", func.now()),
+            },
         )
+
+    def _invalidate_cache(self, *model_ids: int) -> None:
+        if self._user_cache is not None:
+            add_after_commit_callback(
+                self._session, partial(self._user_cache.invalidate, *model_ids)
+            )
+
+    def _sync_leaderboard(self, *users: User) -> None:
+        if self._leaderboard is not None:
+            add_after_commit_callback(self._session, partial(self._leaderboard.update, *users))
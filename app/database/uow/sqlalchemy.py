@@ -1,4 +1,18 @@
+from typing import Awaitable, Callable, List
+
 from sqlalchemy.ext.asyncio import AsyncSession
+from structlog import get_logger
+
+AFTER_COMMIT_CALLBACKS_KEY = "after_commit_callbacks"
+
+logger = get_logger()
+
+
+def add_after_commit_callback(
+    session: AsyncSession,
+    callback: Callable[[], Awaitable[None]],
+) -> None:
+    session.info.setdefault(AFTER_COMMIT_CALLBACKS_KEY, []).append(callback)
 
 
 class SQLAlchemyUoW:
@@ -8,5 +22,17 @@ class SQLAlchemyUoW:
     async def commit(self) -> None:
         await self.session.commit()
 
+        # Side effects outside the database (caches, Redis indexes) must not see uncommitted rows
+        callbacks: List[Callable[[], Awaitable[None]]] = self.session.info.pop(
+            AFTER_COMMIT_CALLBACKS_KEY, []
+        )
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception:
+                # The transaction is committed already, so its caller must not see it as failed
+                logger.exception("After commit callback failed")
+
     async def rollback(self) -> None:
         await self.session.rollback()
+        self.session.info.pop(AFTER_COMMIT_CALLBACKS_KEY, None)
@@ -1,7 +1,7 @@
 from dishka import Provider, Scope, provide, from_context
 
 from app.config import Config
-from app.utils.auth import JWTAuth
+from app.utils.auth import GameTicketManager, JWTAuth
 
 
 class JWTManagerProvider(Provider):
@@ -12,3 +12,7 @@ class JWTManagerProvider(Provider):
     @provide
     def get_jwt_manager(self, jwt_manager: JWTAuth) -> JWTAuth:
         return jwt_manager
+
+    @provide
+    def game_ticket_manager(self, config: Config) -> GameTicketManager:
+        return GameTicketManager(secret_key=config.app.game_ticket_secret_key)
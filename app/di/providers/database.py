@@ -11,11 +11,16 @@ from sqlalchemy.ext.asyncio import (
 from app.config import Config
 from app.database.repositories.bonus_task import BonusTaskRepository
 from app.database.repositories.daily_reward import DailyRewardRepository
+from app.database.repositories.daily_stats import DailyStatsRepository
 from app.database.repositories.game import GameRepository
+from app.database.repositories.referral_ancestor import ReferralAncestorRepository
 from app.database.repositories.referral_link import ReferralLinkRepository
+from app.database.repositories.referral_stats import ReferralStatsRepository
 from app.database.repositories.user import UserRepository
 from app.database.uow.base import BaseUoW
 from app.database.uow.sqlalchemy import SQLAlchemyUoW
+from app.services.leaderboard import Leaderboard
+from app.services.user_cache import UserCache
 
 
 class ConnectionProvider(Provider):
@@ -62,13 +67,26 @@ class RepositoriesProvider(Provider):
     scope = Scope.REQUEST
 
     @provide
-    def user_repo(self, session: AsyncSession) -> UserRepository:
-        return UserRepository(session=session)
+    def user_repo(
+        self,
+        session: AsyncSession,
+        user_cache: UserCache,
+        leaderboard: Leaderboard,
+    ) -> UserRepository:
+        return UserRepository(session=session, user_cache=user_cache, leaderboard=leaderboard)
 
     @provide
     def referral_link_repo(self, session: AsyncSession) -> ReferralLinkRepository:
         return ReferralLinkRepository(session=session)
 
+    @provide
+    def referral_ancestor_repo(self, session: AsyncSession) -> ReferralAncestorRepository:
+        return ReferralAncestorRepository(session=session)
+
+    @provide
+    def referral_stats_repo(self, session: AsyncSession) -> ReferralStatsRepository:
+        return ReferralStatsRepository(session=session)
+
     @provide
     def bonus_task_repo(self, session: AsyncSession) -> BonusTaskRepository:
         return BonusTaskRepository(session=session)
@@ -80,3 +98,7 @@ class RepositoriesProvider(Provider):
     @provide
     def game_repo(self, session: AsyncSession) -> GameRepository:
         return GameRepository(session=session)
+
+    @provide
+    def daily_stats_repo(self, session: AsyncSession) -> DailyStatsRepository:
+        return DailyStatsRepository(session=session)
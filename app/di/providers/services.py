@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from dishka import Provider, Scope, from_context, provide
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import Config
+from app.services.activity import ActivityTracker
+from app.services.game_replay import GameReplayPool
+from app.services.game_session import GameSessionStore
+from app.services.leader_election import LeaderElection
+from app.services.leaderboard import Leaderboard
+from app.services.live_metrics import LiveMetrics
+from app.services.parallel_query import ParallelQueryExecutor
+from app.services.presence import PresenceTracker
+from app.services.ranking_snapshot import RankingSnapshotStore
+from app.services.user_cache import UserCache
+
+
+class ServicesProvider(Provider):
+    scope = Scope.APP
+
+    config = from_context(provides=Config, scope=Scope.APP)
+
+    @provide
+    def user_cache(self, redis: Redis) -> UserCache:
+        return UserCache(redis=redis)
+
+    @provide
+    def activity_tracker(self) -> ActivityTracker:
+        return ActivityTracker()
+
+    @provide
+    def leaderboard(self, redis: Redis) -> Leaderboard:
+        return Leaderboard(redis=redis)
+
+    @provide
+    def ranking_snapshot_store(self, redis: Redis) -> RankingSnapshotStore:
+        return RankingSnapshotStore(redis=redis)
+
+    @provide
+    def leader_election(self, redis: Redis) -> LeaderElection:
+        return LeaderElection(redis=redis)
+
+    @provide
+    def game_session_store(self, redis: Redis) -> GameSessionStore:
+        return GameSessionStore(redis=redis)
+
+    @provide
+    def live_metrics(self, redis: Redis) -> LiveMetrics:
+        return LiveMetrics(redis=redis)
+
+    @provide
+    def presence_tracker(self, redis: Redis) -> PresenceTracker:
+        return PresenceTracker(redis=redis)
+
+    @provide
+    def game_replay_pool(self, config: Config) -> Iterable[GameReplayPool]:
+        game_replay_pool = GameReplayPool(processes=config.game_replay.processes)
+        yield game_replay_pool
+        game_replay_pool.shutdown()
+
+    @provide
+    def parallel_query_executor(
+        self, sessionmaker: async_sessionmaker[AsyncSession]
+    ) -> ParallelQueryExecutor:
+        return ParallelQueryExecutor(sessionmaker=sessionmaker)
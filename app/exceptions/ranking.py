@@ -0,0 +1,6 @@
+from app.exceptions.base import BaseAPIError
+
+
+class InvalidRankingCursorError(BaseAPIError):
+    def __init__(self):
+        super().__init__(message="Ranking cursor is invalid")
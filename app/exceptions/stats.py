@@ -0,0 +1,6 @@
+from app.exceptions.base import BaseAPIError
+
+
+class InvalidStatsPlotRangeError(BaseAPIError):
+    def __init__(self, reason: str):
+        super().__init__(message=f"Stats plot range is invalid: {reason}")
@@ -3,8 +3,8 @@ from dishka.integrations.fastapi import DishkaRoute
 from fastapi import APIRouter, Security
 
 from app.database.models import ReferralLink
+from app.database.repositories.daily_stats import DailyStatsRepository
 from app.database.repositories.referral_link import ReferralLinkRepository
-from app.database.repositories.user import UserRepository
 from app.database.uow.base import BaseUoW
 from app.handlers.user.account import bot_jwt_auth
 from app.schemas.admin.referral_links import (
@@ -18,8 +18,9 @@ from app.schemas.admin.referral_links import (
     ReferralLinkStats,
     ActivateReferralLinkResponse,
 )
-from app.schemas.admin.stats import UsersAmountStats, UsersDynamicStats, DetailedStatsEntity
+from app.schemas.admin.stats import UsersAmountStats, UsersDynamicStats
 from app.schemas.base import AdminReferralLinkEntity, ErrorResponse
+from app.services.parallel_query import ParallelQueryExecutor
 
 referral_links_router = APIRouter(
     prefix="/referralLinks",
@@ -109,41 +110,33 @@ async def get_inactive_referral_links(
 )
 async def get_referral_link_by_id(
     referral_link_repo: FromDishka[ReferralLinkRepository],
-    user_repo: FromDishka[UserRepository],
+    parallel_query_executor: FromDishka[ParallelQueryExecutor],
     id: str,
 ):
     referral_link = await referral_link_repo.get_by_id(model_id=id)
 
-    total_users, active_users, inactive_users = await user_repo.get_users_amount_stats(
-        referral_source=referral_link.id
-    )
-    daily_dynamic, weekly_dynamic, monthly_dynamic = await user_repo.get_users_dynamic_stats(
-        referral_source=referral_link.id
+    results = await parallel_query_executor.run(
+        users_amount=lambda session: DailyStatsRepository(session).get_users_amount_stats(
+            referral_link_id=referral_link.id
+        ),
+        users_dynamic=lambda session: DailyStatsRepository(session).get_users_dynamic_stats(
+            referral_link_id=referral_link.id
+        ),
     )
+    users_amount = results["users_amount"]
+    users_dynamic = results["users_dynamic"]
 
     return GetReferralLinkByIdResponse(
         referral_link=AdminReferralLinkEntity.from_referral_link_model(referral_link),
         stats=ReferralLinkStats(
-            users_amount_stats=UsersAmountStats(
-                total_users=total_users,
-                active_users=DetailedStatsEntity(
-                    amount=active_users, percentage_reference_value=total_users
-                ),
-                inactive_users=DetailedStatsEntity(
-                    amount=inactive_users, percentage_reference_value=total_users
-                ),
-            ),
-            dynamic_stats=UsersDynamicStats(
-                daily_dynamic=DetailedStatsEntity(
-                    amount=daily_dynamic, percentage_reference_value=total_users
-                ),
-                weekly_dynamic=DetailedStatsEntity(
-                    amount=weekly_dynamic, percentage_reference_value=total_users
-                ),
-                monthly_dynamic=DetailedStatsEntity(
-                    amount=monthly_dynamic, percentage_reference_value=total_users
-                ),
-            ),
+            users_amount_stats=UsersAmountStats.from_amounts(*users_amount)
+            if users_amount is not None
+            else None,
+            dynamic_stats=UsersDynamicStats.from_dynamics(
+                *users_dynamic, total_users=users_amount[0]
+            )
+            if users_amount is not None and users_dynamic is not None
+            else None,
         ),
     )
 
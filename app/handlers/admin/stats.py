@@ -1,21 +1,42 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict
+
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Security
+from fastapi import APIRouter, Security, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.repositories.game import GameRepository
+from app.database.repositories.daily_stats import DailyStatsRepository
 from app.database.repositories.user import UserRepository
+from app.exceptions.stats import InvalidStatsPlotRangeError
 from app.handlers.user.account import bot_jwt_auth
 from app.schemas.admin.stats import (
     AdminStatsResponse,
     UsersAmountStats,
     UsersDynamicStats,
-    DetailedStatsEntity,
+    UsersActivityStats,
     GameStats,
     GamePlayersAmountStats,
     GamePlayersEngagementStats,
+    AdminOnlineStatsResponse,
     AdminPlotStatsResponse,
 )
 from app.schemas.base import ErrorResponse
+from app.services.game_session import GameSessionStore
+from app.services.live_metrics import LiveMetrics
+from app.services.parallel_query import ParallelQueryExecutor
+from app.services.presence import PresenceTracker
+from app.typings.consts import (
+    ADMIN_STATS_PLOT_DAYS_AMOUNT,
+    ADMIN_STATS_PLOT_MAX_BUCKETS,
+    GAMES_ABANDONED_AFTER_SECONDS,
+    PRESENCE_HISTORY_RETENTION_SECONDS,
+    PRESENCE_RETENTION_SECONDS,
+    STATS_PLOT_GRANULARITY_INTERVALS,
+)
+from app.typings.literals import StatsPlotGranularityLiteral
+from app.utils.dt import get_client_side_date
 
 admin_stats_router = APIRouter(
     prefix="/stats",
@@ -35,69 +56,104 @@ admin_stats_router = APIRouter(
     include_in_schema=False,
 )
 async def get_stats(
-    user_repo: FromDishka[UserRepository],
-    game_repo: FromDishka[GameRepository],
+    parallel_query_executor: FromDishka[ParallelQueryExecutor],
+    game_session_store: FromDishka[GameSessionStore],
+    live_metrics: FromDishka[LiveMetrics],
+    presence_tracker: FromDishka[PresenceTracker],
 ):
-    total_users, active_users, inactive_users = await user_repo.get_users_amount_stats()
+    users_amount = await live_metrics.get_users_amounts()
+    queries: Dict[str, Callable[[AsyncSession], Awaitable[Any]]] = {
+        "users_dynamic": lambda session: DailyStatsRepository(session).get_users_dynamic_stats(),
+        "players_amount": lambda session: DailyStatsRepository(session).get_game_players_stats(),
+        "engagement": lambda session: DailyStatsRepository(session).get_game_engagement_stats(),
+    }
+
+    # Live counters are not seeded until the first reconciliation, rollups are exact meanwhile
+    if users_amount is None:
+        queries["users_amount"] = lambda session: DailyStatsRepository(
+            session
+        ).get_users_amount_stats()
 
-    daily_dynamic, weekly_dynamic, monthly_dynamic = await user_repo.get_users_dynamic_stats()
     (
-        total_players,
-        active_players,
-        inactive_players,
+        results,
+        games_in_progress_amount,
         players_online,
-    ) = await user_repo.get_game_players_stats()
-    (
-        total_games_played,
-        daily_unique_players,
-        daily_games_played,
-        weekly_games_played,
-    ) = await game_repo.get_game_engagement_stats()
-    games_in_progress_amount = await game_repo.get_games_in_progress_amount()
+        active_users,
+        unique_players,
+    ) = await asyncio.gather(
+        parallel_query_executor.run(**queries),
+        game_session_store.count_in_progress(
+            abandoned_after_seconds=GAMES_ABANDONED_AFTER_SECONDS,
+        ),
+        presence_tracker.count_online(),
+        live_metrics.get_active_users_amounts(),
+        live_metrics.get_players_amounts(),
+    )
+    users_amount = users_amount or results.get("users_amount")
+    users_dynamic = results["users_dynamic"]
+    players_amount = results["players_amount"]
+    engagement = results["engagement"]
 
+    # Sections depending on a failed query are left empty
     return AdminStatsResponse(
-        users_amount_stats=UsersAmountStats(
-            total_users=total_users,
-            active_users=DetailedStatsEntity(
-                amount=active_users, percentage_reference_value=total_users
-            ),
-            inactive_users=DetailedStatsEntity(
-                amount=inactive_users, percentage_reference_value=total_users
-            ),
-        ),
-        dynamic_stats=UsersDynamicStats(
-            daily_dynamic=DetailedStatsEntity(
-                amount=daily_dynamic, percentage_reference_value=total_users
-            ),
-            weekly_dynamic=DetailedStatsEntity(
-                amount=weekly_dynamic, percentage_reference_value=total_users
-            ),
-            monthly_dynamic=DetailedStatsEntity(
-                amount=monthly_dynamic, percentage_reference_value=total_users
-            ),
-        ),
+        users_amount_stats=UsersAmountStats.from_amounts(*users_amount)
+        if users_amount is not None
+        else None,
+        dynamic_stats=UsersDynamicStats.from_dynamics(*users_dynamic, total_users=users_amount[0])
+        if users_amount is not None and users_dynamic is not None
+        else None,
+        activity_stats=UsersActivityStats.from_activity(*active_users, total_users=users_amount[0])
+        if users_amount is not None
+        else None,
         game_stats=GameStats(
-            players=GamePlayersAmountStats(
-                total_players=total_players,
-                active_players=DetailedStatsEntity(
-                    amount=active_players, percentage_reference_value=total_players
-                ),
-                inactive_players=DetailedStatsEntity(
-                    amount=inactive_players, percentage_reference_value=total_players
-                ),
-                players_online=players_online,
-            ),
+            players=GamePlayersAmountStats.from_amounts(*players_amount, players_online)
+            if players_amount is not None
+            else None,
             games_in_progress=games_in_progress_amount,
             engagement=GamePlayersEngagementStats(
-                total_games_played=total_games_played,
-                daily_unique_players=daily_unique_players,
-                daily_games_played=daily_games_played,
-                weekly_games_played=weekly_games_played,
-            ),
+                total_games_played=engagement[0],
+                daily_unique_players=unique_players[0],
+                weekly_unique_players=unique_players[1],
+                monthly_unique_players=unique_players[2],
+                daily_games_played=engagement[1],
+                weekly_games_played=engagement[2],
+            )
+            if engagement is not None
+            else None,
         ),
     )
 
 
+@admin_stats_router.get(
+    "/online",
+    summary="Get Online Stats",
+    responses={
+        200: {"model": AdminOnlineStatsResponse},
+        401: {"model": ErrorResponse},
+    },
+    tags=["Admin Stats Actions"],
+    dependencies=[Security(bot_jwt_auth)],
+    include_in_schema=False,
+)
+async def get_online_stats(
+    presence_tracker: FromDishka[PresenceTracker],
+    window_minutes: int = Query(default=60, ge=1, le=PRESENCE_RETENTION_SECONDS // 60),
+    history_minutes: int = Query(default=60, ge=1, le=PRESENCE_HISTORY_RETENTION_SECONDS // 60),
+):
+    players_online, players_online_in_window, (buckets, history) = await asyncio.gather(
+        presence_tracker.count_online(),
+        presence_tracker.count_online(window_seconds=window_minutes * 60),
+        presence_tracker.get_history(period_seconds=history_minutes * 60),
+    )
+
+    return AdminOnlineStatsResponse(
+        players_online=players_online,
+        players_online_in_window=players_online_in_window,
+        buckets=buckets,
+        players_online_history=history,
+    )
+
+
 @admin_stats_router.get(
     "/plot",
     summary="Get Plot Stats",
@@ -111,10 +167,36 @@ async def get_stats(
 )
 async def get_plot_stats(
     user_repo: FromDishka[UserRepository],
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    granularity: StatsPlotGranularityLiteral = "day",
+    source: str | None = Query(default=None),
 ):
-    new_users, blocked_users, users_without_source = await user_repo.get_data_for_stats_plot()
+    # Both dates are inclusive client side calendar days
+    date_to = date_to or get_client_side_date()
+    date_from = date_from or date_to - timedelta(days=ADMIN_STATS_PLOT_DAYS_AMOUNT - 1)
+
+    if date_from > date_to:
+        raise InvalidStatsPlotRangeError("date_from is after date_to")
+
+    period = date_to - date_from + timedelta(days=1)
+    if period / STATS_PLOT_GRANULARITY_INTERVALS[granularity] > ADMIN_STATS_PLOT_MAX_BUCKETS:
+        raise InvalidStatsPlotRangeError(f"more than {ADMIN_STATS_PLOT_MAX_BUCKETS} buckets")
+
+    (
+        buckets,
+        new_users,
+        blocked_users,
+        users_without_source,
+    ) = await user_repo.get_data_for_stats_plot(
+        period_start=date_from,
+        period_end=date_to,
+        granularity=granularity,
+        referral_link_id=source,
+    )
 
     return AdminPlotStatsResponse(
+        buckets=buckets,
         new_users=new_users,
         blocked_users=blocked_users,
         users_without_source=users_without_source,
@@ -15,6 +15,8 @@ from app.exceptions.database import (
     DBActionNotAllowedError,
 )
 from app.exceptions.game import GameStartImpossibleError
+from app.exceptions.ranking import InvalidRankingCursorError
+from app.exceptions.stats import InvalidStatsPlotRangeError
 from app.schemas.base import ErrorResponse
 
 
@@ -98,3 +100,21 @@ async def daily_reward_already_claimed_exception_handler(
         status_code=status.HTTP_400_BAD_REQUEST,
         message=exc.message,
     ).json_response
+
+
+async def invalid_ranking_cursor_exception_handler(
+    _: Request, exc: InvalidRankingCursorError
+) -> JSONResponse:
+    return ErrorResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        message=exc.message,
+    ).json_response
+
+
+async def invalid_stats_plot_range_exception_handler(
+    _: Request, exc: InvalidStatsPlotRangeError
+) -> JSONResponse:
+    return ErrorResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        message=exc.message,
+    ).json_response
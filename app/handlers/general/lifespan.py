@@ -3,11 +3,14 @@ from contextlib import asynccontextmanager
 from apscheduler.executors.asyncio import AsyncIOExecutor  # type: ignore[import-untyped]
 from dishka import AsyncContainer
 from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
+from app.config import config
+from app.cron.account import flush_users_activity
+from app.services.activity import ActivityTracker
+from app.services.leader_election import LeaderElection
+from app.services.live_metrics import LiveMetrics
+from app.services.presence import PresenceTracker
 from app.setup import setup_scheduler
 
 
@@ -15,13 +18,20 @@ from app.setup import setup_scheduler
 async def lifespan(app: FastAPI):
     dishka_container: AsyncContainer = app.state.dishka_container
     sessionmaker = await dishka_container.get(async_sessionmaker[AsyncSession])
-    redis = await dishka_container.get(Redis)
+    activity_tracker = await dishka_container.get(ActivityTracker)
+    live_metrics = await dishka_container.get(LiveMetrics)
+    presence_tracker = await dishka_container.get(PresenceTracker)
+    leader_election = await dishka_container.get(LeaderElection)
 
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
-    scheduler = setup_scheduler(sessionmaker)
+    scheduler = await setup_scheduler(
+        dishka_container,
+        run_cluster_jobs=config.scheduler.run_in_api_workers,
+    )
     scheduler.start()
 
     yield
 
     scheduler.shutdown()
+    await leader_election.release()
+    await flush_users_activity(sessionmaker, activity_tracker, live_metrics, presence_tracker)
     await app.state.dishka_container.close()
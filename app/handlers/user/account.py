@@ -7,7 +7,9 @@ from fastapi import Security
 
 from app.config import config
 from app.database.models import User
+from app.database.repositories.referral_ancestor import ReferralAncestorRepository
 from app.database.repositories.referral_link import ReferralLinkRepository
+from app.database.repositories.referral_stats import ReferralStatsRepository
 from app.database.repositories.user import UserRepository
 from app.database.uow.base import BaseUoW
 from app.exceptions.auth import InitDataAuthError
@@ -26,6 +28,7 @@ from app.schemas.user.account import (
     UserRegistrationResponse,
     GetUserResponse,
 )
+from app.services.live_metrics import LiveMetrics
 from app.typings.consts import DEFAULT_REFERRAL_BONUS, DEFAULT_PREMIUM_REFERRAL_BONUS
 from app.typings.enums import UserLanguage
 from app.utils.auth import InitDataAuthManager, JWTAuth
@@ -60,37 +63,51 @@ async def registration_handler(
     data: UserRegistrationInputData,
     user_repo: FromDishka[UserRepository],
     referral_link_repo: FromDishka[ReferralLinkRepository],
+    referral_ancestor_repo: FromDishka[ReferralAncestorRepository],
+    referral_stats_repo: FromDishka[ReferralStatsRepository],
+    live_metrics: FromDishka[LiveMetrics],
     uow: FromDishka[BaseUoW],
 ) -> UserRegistrationResponse:
     reward = 0
+    referrer_id = None
+    referral_link_id = None
 
     if data.source is not None:
         if data.source.isdigit():
-            referrer = await user_repo.get_by_id(model_id=int(data.source))
-            if referrer is None:
-                data.source = None
-            else:
-                reward = (
-                    DEFAULT_PREMIUM_REFERRAL_BONUS if data.is_premium else DEFAULT_REFERRAL_BONUS
-                )
-                await user_repo.reward_for_referral(
-                    model_id=referrer.id,
+            reward = DEFAULT_PREMIUM_REFERRAL_BONUS if data.is_premium else DEFAULT_REFERRAL_BONUS
+
+            try:
+                referrer = await user_repo.reward_for_referral(
+                    model_id=int(data.source),
                     amount=reward,
                 )
+                referrer_id = referrer.id
+            except RecordNotFoundError:
+                reward = 0
+                data.source = None
         else:
             try:
-                await referral_link_repo.get_by_id(model_id=data.source)
+                referral_link = await referral_link_repo.get_by_id(model_id=data.source)
+                referral_link_id = referral_link.id
             except RecordNotFoundError:
                 data.source = None
 
     user_model = User(
         **data.model_dump(exclude_none=True, exclude={"is_premium"}),
+        referrer_id=referrer_id,
+        referral_link_id=referral_link_id,
         balance=reward,
         referral_registration_bonus=reward,
     )
 
     user = await user_repo.create(user_model)
+
+    if referrer_id is not None:
+        await referral_ancestor_repo.add_referral(user_id=user.id, referrer_id=referrer_id)
+        await referral_stats_repo.add_referral(user_id=user.id, registration_bonus=reward)
+
     await uow.commit()
+    await live_metrics.register_user()
 
     return UserRegistrationResponse(user=UserBotEntity.from_user_model(user))
 
@@ -108,6 +125,9 @@ async def login_handler(
     data: RenewJWTInputData,
     user_repo: FromDishka[UserRepository],
     referral_link_repo: FromDishka[ReferralLinkRepository],
+    referral_ancestor_repo: FromDishka[ReferralAncestorRepository],
+    referral_stats_repo: FromDishka[ReferralStatsRepository],
+    live_metrics: FromDishka[LiveMetrics],
     uow: FromDishka[BaseUoW],
     jwt_manager: FromDishka[JWTAuth],
     auth_manager: FromDishka[InitDataAuthManager],
@@ -144,6 +164,9 @@ async def login_handler(
             ),
             user_repo=user_repo,
             referral_link_repo=referral_link_repo,
+            referral_ancestor_repo=referral_ancestor_repo,
+            referral_stats_repo=referral_stats_repo,
+            live_metrics=live_metrics,
             uow=uow,
         )
 
@@ -170,10 +193,9 @@ async def login_handler(
     tags=["Account actions"],
 )
 async def get_me_handler(
-    user_repo: FromDishka[UserRepository],
     jwt_data: JWTValidationData = Security(jwt_auth),
 ):
-    user = await user_repo.get_by_id(model_id=jwt_data.parsed_data.user_id)
+    user = jwt_data.extra_data.user
 
     return GetUserResponse(user=UserEntity.from_user_model(user))
 
@@ -209,6 +231,7 @@ async def get_by_id_handler(
 )
 async def set_inactive_handler(
     user_repo: FromDishka[UserRepository],
+    live_metrics: FromDishka[LiveMetrics],
     uow: FromDishka[BaseUoW],
     user_id: int = Body(embed=True),
 ):
@@ -217,6 +240,7 @@ async def set_inactive_handler(
     )
 
     await uow.commit()
+    await live_metrics.block_user(user_id)
     return SetUserInactiveResponse(user=UserBotEntity.from_user_model(user))
 
 
@@ -232,10 +256,12 @@ async def set_inactive_handler(
 )
 async def set_active_handler(
     user_repo: FromDishka[UserRepository],
+    live_metrics: FromDishka[LiveMetrics],
     uow: FromDishka[BaseUoW],
     user_id: int = Body(embed=True),
 ):
     user = await user_repo.update_one_by_id(model_id=user_id, bot_blocked_at=None)
 
     await uow.commit()
+    await live_metrics.unblock_user(user_id)
     return SetUserInactiveResponse(user=UserBotEntity.from_user_model(user))
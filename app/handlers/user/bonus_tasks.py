@@ -90,7 +90,9 @@ async def claim_bonus_task(
     user = await user_repo.update_one_by_id(
         model_id=user_id,
         balance=User.balance + bonus_task.reward_amount,
-        daily_overall_profit=User.daily_overall_profit + bonus_task.reward_amount,
+        **User.roll_daily_counters(
+            daily_overall_profit=User.current_daily_overall_profit + bonus_task.reward_amount,
+        ),
     )
 
     await uow.commit()
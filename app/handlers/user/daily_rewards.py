@@ -113,7 +113,7 @@ async def claim_daily_reward(
         user_id=user.id,
         daily_reward_id=reward.id,
     )
-    await user_repo.claim_reward(
+    user = await user_repo.claim_reward(
         user_id=user.id,
         reward=reward,
     )
@@ -5,21 +5,19 @@ from dishka.integrations.fastapi import DishkaRoute
 from fastapi import APIRouter, Security
 from structlog import get_logger
 
-from app.database.models import Game
-from app.database.repositories.game import GameRepository
+from app.database.models import Game, User
 from app.database.repositories.user import UserRepository
 from app.database.uow.base import BaseUoW
+from app.exceptions.database import DBActionNotAllowedError, RecordNotFoundError
 from app.exceptions.game import GameStartImpossibleError
 from app.handlers.user.account import jwt_auth
 from app.schemas.base import ErrorResponse, UserEntity
 from app.schemas.general.auth import JWTValidationData, GameFinishChecksumData
 from app.schemas.user.game import StartGameResponse, FinishGameResponse
-from app.typings.consts import (
-    GAME_LEVELS_POINTS_MAPPER,
-    GAME_SECONDS_MINUMUM_FOR_ONE_LAP,
-    GAME_LEVELS_SUSPICION_AFTER,
-)
-from app.utils.auth import ChecksumAuth
+from app.services.game_replay import GameReplayPool
+from app.services.game_session import GameSessionStore
+from app.utils.auth import ChecksumAuth, GameTicketManager
+from app.utils.fraud import detect_suspicious_progress
 
 logger = get_logger()
 
@@ -27,7 +25,12 @@ game_router = APIRouter(prefix="/game", route_class=DishkaRoute)
 game_finish_checksum_scheme = ChecksumAuth(
     auth_data_model=GameFinishChecksumData,
     name="Checksum Cookie",
-    description="Checksum for game finishing. Format: b'score=999&game_id=8590e1f6-254e-4f26-99eb-60f2e3df0dc4'. Encode similar string using Fernet",
+    description=(
+        "Checksum for game finishing. Format: "
+        "b'score=999&game_id=8590e1f6-254e-4f26-99eb-60f2e3df0dc4"
+        "&ticket=<ticket from start>&events=<ms>:<points>,...' "
+        "(ticket and events are optional). Encode similar string using Fernet"
+    ),
 )
 
 
@@ -42,20 +45,24 @@ game_finish_checksum_scheme = ChecksumAuth(
 )
 async def start_game_handler(
     user_repo: FromDishka[UserRepository],
-    game_repo: FromDishka[GameRepository],
+    game_session_store: FromDishka[GameSessionStore],
+    game_ticket_manager: FromDishka[GameTicketManager],
     uow: FromDishka[BaseUoW],
     jwt_data: JWTValidationData = Security(jwt_auth),
 ):
     user = jwt_data.extra_data.user
 
-    if user.game_energy <= 0:
+    if user.current_game_energy <= 0:
         raise GameStartImpossibleError("Not enough energy")
 
-    user = await user_repo.decrement_game_energy(user.id)
-    game = await game_repo.create(game=Game(user_id=user.id))
-
+    try:
+        user = await user_repo.decrement_game_energy(user.id)
+    except DBActionNotAllowedError:
+        raise GameStartImpossibleError("Not enough energy")
     await uow.commit()
-    return StartGameResponse(game_id=game.id)
+
+    game = await game_session_store.start(user_id=user.id)
+    return StartGameResponse(game_id=game.id, ticket=game_ticket_manager.issue(game))
 
 
 @game_router.post(
@@ -70,64 +77,92 @@ async def start_game_handler(
 )
 async def finish_game_handler(
     user_repo: FromDishka[UserRepository],
-    game_repo: FromDishka[GameRepository],
+    game_session_store: FromDishka[GameSessionStore],
+    game_ticket_manager: FromDishka[GameTicketManager],
+    game_replay_pool: FromDishka[GameReplayPool],
     uow: FromDishka[BaseUoW],
     checksum_data: GameFinishChecksumData = Security(game_finish_checksum_scheme),
     jwt_data: JWTValidationData = Security(jwt_auth),
 ):
-    user = jwt_data.extra_data.user
-    game = await game_repo.get_active_game(model_id=checksum_data.game_id, user_id=user.id)
-    update_daily_highscore = False
-    update_alltime_highscore = False
-
-    marked_as_suspicious = _check_game_for_suspicion(game=game, score=checksum_data.score)
+    user_id = jwt_data.extra_data.user.id
+
+    if checksum_data.ticket is not None:
+        game = game_ticket_manager.verify(checksum_data.ticket)
+
+        if (
+            game is None
+            or game.id != checksum_data.game_id
+            or game.user_id != user_id
+            or not await game_session_store.claim_ticket(game)
+        ):
+            raise RecordNotFoundError(Game.__name__)
+    else:
+        # Clients without a ticket are served from the session store
+        game = await game_session_store.claim(user_id=user_id, game_id=checksum_data.game_id)
+
+        if game is None:
+            raise RecordNotFoundError(Game.__name__)
+
+    game.score = checksum_data.score
+    game.finished_at = datetime.datetime.utcnow()
+
+    try:
+        user = await _finish_game(
+            game=game,
+            events=checksum_data.events,
+            user_repo=user_repo,
+            game_session_store=game_session_store,
+            game_replay_pool=game_replay_pool,
+            uow=uow,
+        )
+    except Exception:
+        await game_session_store.release(game)
+        raise
+
+    if game.marked_as_suspicious:
+        logger.info(f"Game with id {game.id} was marked as suspicious")
 
-    await game_repo.finish_game(
-        game_id=game.id,
-        score=checksum_data.score,
-        marked_as_suspicious=marked_as_suspicious,
-    )
+    return FinishGameResponse(user=UserEntity.from_user_model(user=user))
 
-    if game.score > user.game_daily_highscore:
-        update_daily_highscore = True
-    if game.score > user.game_alltime_highscore:
-        update_alltime_highscore = True
 
-    user = await user_repo.update_highscores(
-        update_daily_highscore=update_daily_highscore,
-        update_alltime_highscore=update_alltime_highscore,
-        user_id=user.id,
+async def _finish_game(
+    game: Game,
+    events: str | None,
+    user_repo: UserRepository,
+    game_session_store: GameSessionStore,
+    game_replay_pool: GameReplayPool,
+    uow: BaseUoW,
+) -> User:
+    replayed_score = None
+
+    if events is not None:
+        played_ms = (game.finished_at - game.created_at) // datetime.timedelta(milliseconds=1)
+        replayed_score = await game_replay_pool.replay(events=events, duration_ms=played_ms)
+
+    if replayed_score is not None:
+        # Only points proven by the replay are credited
+        score_is_suspicious = replayed_score != game.score
+        game.score = min(game.score, replayed_score)
+    else:
+        score_is_suspicious = _check_game_for_suspicion(game=game)
+
+    user, game.marked_as_suspicious = await user_repo.finish_game(
+        user_id=game.user_id,
         score=game.score,
+        score_is_suspicious=score_is_suspicious,
     )
+    # Every game passes the batch fraud review, the inline check is only a first guess
+    game.on_fraud_check = True
 
-    await user_repo.reward_user_referrers(
-        user_id=user.id,
-        initial_profit=checksum_data.score,
-    )
+    # Queued before the commit, so a crash right after it cannot lose the game. The flusher
+    # skips games persisted already, and a failed commit withdraws the game on release
+    await game_session_store.enqueue_finished(game)
     await uow.commit()
 
-    return FinishGameResponse(user=UserEntity.from_user_model(user=user))
-
+    return user
 
-def _check_game_for_suspicion(game: Game, score: int) -> bool:
-    played_seconds = (datetime.datetime.utcnow() - game.created_at).seconds
-    completed_levels_amount = 0
-    cumulative_score = 0
 
-    for level, level_points in GAME_LEVELS_POINTS_MAPPER.items():
-        cumulative_score += level_points
-        if score >= cumulative_score:
-            completed_levels_amount += 1
-        else:
-            break
-
-    minimum_played_seconds = GAME_SECONDS_MINUMUM_FOR_ONE_LAP * completed_levels_amount
-    marked_as_suspicious = (
-        completed_levels_amount >= GAME_LEVELS_SUSPICION_AFTER
-        or minimum_played_seconds >= played_seconds
-    )
-
-    if marked_as_suspicious:
-        logger.info(f"Game with id {game.id} was marked as suspicious")
+def _check_game_for_suspicion(game: Game) -> bool:
+    played_seconds = (game.finished_at - game.created_at).total_seconds()  # type: ignore[operator]
 
-    return marked_as_suspicious
+    return bool(detect_suspicious_progress(scores=game.score, durations=played_seconds))
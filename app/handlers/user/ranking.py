@@ -1,13 +1,19 @@
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Security, Query
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, Security, Query, Header, Response, status
 
 from app.database.repositories.user import UserRepository
 from app.handlers.user.account import jwt_auth
 from app.schemas.base import ErrorResponse
 from app.schemas.general.auth import JWTValidationData
-from app.schemas.user.ranking import GetUserRankingInfoResponse, GetRankingChunkResponse
+from app.schemas.user.ranking import (
+    GetUserRankingInfoResponse,
+    GetRankingChunkResponse,
+    GetRankingPageResponse,
+    RankingCursor,
+)
+from app.services.leaderboard import Leaderboard
+from app.services.ranking_snapshot import RankingSnapshotStore
 from app.typings.consts import RANKING_MAX_TOP_PLACE, RANKING_CHUNK_SIZE
 from app.typings.literals import RankingsPeriodLiteral, RankingsTypeLiteral
 from app.utils.ranking import get_ranking_field
@@ -26,16 +32,16 @@ ranking_router = APIRouter(prefix="/ranking", route_class=DishkaRoute)
     tags=["Ranking actions"],
 )
 async def get_user_ranking_info_handler(
-    user_repo: FromDishka[UserRepository],
+    leaderboard: FromDishka[Leaderboard],
     ranking_period: RankingsPeriodLiteral,
     ranking_type: RankingsTypeLiteral,
     jwt_data: JWTValidationData = Security(jwt_auth),
 ):
     ranking_field = get_ranking_field(ranking_type, ranking_period)
 
-    user_place, user_score = await user_repo.get_user_ranking_info(
-        model_id=jwt_data.parsed_data.user_id,
+    user_place, user_score = await leaderboard.get_place(
         ranking_field=ranking_field,
+        user=jwt_data.extra_data.user,
     )
 
     return GetUserRankingInfoResponse(place=user_place, score=user_score)  # type: ignore[arg-type]
@@ -45,6 +51,7 @@ async def get_user_ranking_info_handler(
     "/getRankingChunk",
     responses={
         200: {"model": GetRankingChunkResponse},
+        304: {"description": "Ranking chunk was not modified"},
         401: {"model": ErrorResponse},
         400: {"model": ErrorResponse},
     },
@@ -52,22 +59,67 @@ async def get_user_ranking_info_handler(
     summary="Get Ranking Chunk",
     tags=["Ranking actions"],
 )
-@cache(expire=5)
 async def get_ranking_chunk_handler(
-    user_repo: FromDishka[UserRepository],
+    ranking_snapshot_store: FromDishka[RankingSnapshotStore],
     ranking_period: RankingsPeriodLiteral,
     ranking_type: RankingsTypeLiteral,
-    offset: int = Query(default=0, ge=0, le=RANKING_MAX_TOP_PLACE - RANKING_CHUNK_SIZE),
+    offset: int = Query(
+        default=0,
+        ge=0,
+        le=RANKING_MAX_TOP_PLACE - RANKING_CHUNK_SIZE,
+        multiple_of=RANKING_CHUNK_SIZE,
+    ),
+    if_none_match: str | None = Header(default=None),
 ):
     ranking_field = get_ranking_field(ranking_type, ranking_period)
 
-    ranking_chunk = await user_repo.get_ranking_chunk(
+    ranking_chunk = await ranking_snapshot_store.get_chunk(
         ranking_field=ranking_field,
         offset=offset,
     )
 
-    return GetRankingChunkResponse.from_ranking_chunk(
-        ranking_chunk=ranking_chunk,
-        ranking_offset=offset,
+    if ranking_chunk is None:
+        return GetRankingChunkResponse(users=[])
+
+    body, etag = ranking_chunk
+    headers = {"ETag": etag}
+
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@ranking_router.get(
+    "/getRankingPage",
+    responses={
+        200: {"model": GetRankingPageResponse},
+        401: {"model": ErrorResponse},
+        400: {"model": ErrorResponse},
+    },
+    dependencies=[Security(jwt_auth)],
+    summary="Get Ranking Page",
+    tags=["Ranking actions"],
+)
+async def get_ranking_page_handler(
+    user_repo: FromDishka[UserRepository],
+    ranking_period: RankingsPeriodLiteral,
+    ranking_type: RankingsTypeLiteral,
+    cursor: str | None = None,
+):
+    ranking_field = get_ranking_field(ranking_type, ranking_period)
+    ranking_cursor = RankingCursor.decode(cursor) if cursor is not None else None
+    ranking_offset = ranking_cursor.place if ranking_cursor is not None else 0
+    page_size = max(min(RANKING_CHUNK_SIZE, RANKING_MAX_TOP_PLACE - ranking_offset), 0)
+
+    ranking_page = await user_repo.get_ranking_page(
         ranking_field=ranking_field,
+        limit=page_size,
+        after=ranking_cursor.keyset if ranking_cursor is not None else None,
+    )
+
+    return GetRankingPageResponse.from_ranking_page(
+        ranking_page=ranking_page,
+        ranking_offset=ranking_offset,
+        page_size=page_size,
     )
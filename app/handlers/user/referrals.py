@@ -2,6 +2,7 @@ from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
 from fastapi import APIRouter, Security
 
+from app.database.repositories.referral_stats import ReferralStatsRepository
 from app.database.repositories.user import UserRepository
 from app.database.uow.base import BaseUoW
 from app.handlers.user.account import jwt_auth
@@ -26,19 +27,21 @@ referrals_router = APIRouter(prefix="/referrals", route_class=DishkaRoute)
     tags=["Referrals actions"],
 )
 async def get_referrals_stats_handler(
-    user_repo: FromDishka[UserRepository],
+    referral_stats_repo: FromDishka[ReferralStatsRepository],
     jwt_data: JWTValidationData = Security(jwt_auth),
 ):
-    referrals_stats = await user_repo.get_referrals_stats(model_id=jwt_data.parsed_data.user_id)
+    referrals_stats = await referral_stats_repo.get_by_user_id(
+        user_id=jwt_data.parsed_data.user_id,
+    )
 
     return ReferralsStatsResponse(
         levels=[
             ReferralsStatsLevel(
-                referrals_amount=referrals_amount,
-                referrals_profit=referrals_profit,
-                level=level,
+                referrals_amount=level_stats.referrals_amount,
+                referrals_profit=level_stats.referrals_profit,
+                level=level_stats.level,
             )
-            for referrals_amount, referrals_profit, level in referrals_stats
+            for level_stats in referrals_stats
         ]
     )
 
@@ -15,8 +15,8 @@ class GetInactiveReferralLinksResponse(BaseModel):
 
 
 class ReferralLinkStats(BaseModel):
-    users_amount_stats: UsersAmountStats
-    dynamic_stats: UsersDynamicStats
+    users_amount_stats: UsersAmountStats | None
+    dynamic_stats: UsersDynamicStats | None
 
 
 class GetReferralLinkByIdResponse(BaseModel):
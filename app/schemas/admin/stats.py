@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List
 
 from pydantic import BaseModel
@@ -13,12 +14,68 @@ class UsersAmountStats(BaseModel):
     active_users: DetailedStatsEntity
     inactive_users: DetailedStatsEntity
 
+    @classmethod
+    def from_amounts(
+        cls, total_users: int, active_users: int, inactive_users: int
+    ) -> "UsersAmountStats":
+        return cls(
+            total_users=total_users,
+            active_users=DetailedStatsEntity(
+                amount=active_users, percentage_reference_value=total_users
+            ),
+            inactive_users=DetailedStatsEntity(
+                amount=inactive_users, percentage_reference_value=total_users
+            ),
+        )
+
 
 class UsersDynamicStats(BaseModel):
     daily_dynamic: DetailedStatsEntity
     weekly_dynamic: DetailedStatsEntity
     monthly_dynamic: DetailedStatsEntity
 
+    @classmethod
+    def from_dynamics(
+        cls, daily_dynamic: int, weekly_dynamic: int, monthly_dynamic: int, total_users: int
+    ) -> "UsersDynamicStats":
+        return cls(
+            daily_dynamic=DetailedStatsEntity(
+                amount=daily_dynamic, percentage_reference_value=total_users
+            ),
+            weekly_dynamic=DetailedStatsEntity(
+                amount=weekly_dynamic, percentage_reference_value=total_users
+            ),
+            monthly_dynamic=DetailedStatsEntity(
+                amount=monthly_dynamic, percentage_reference_value=total_users
+            ),
+        )
+
+
+class UsersActivityStats(BaseModel):
+    daily_active_users: DetailedStatsEntity
+    weekly_active_users: DetailedStatsEntity
+    monthly_active_users: DetailedStatsEntity
+
+    @classmethod
+    def from_activity(
+        cls,
+        daily_active_users: int,
+        weekly_active_users: int,
+        monthly_active_users: int,
+        total_users: int,
+    ) -> "UsersActivityStats":
+        return cls(
+            daily_active_users=DetailedStatsEntity(
+                amount=daily_active_users, percentage_reference_value=total_users
+            ),
+            weekly_active_users=DetailedStatsEntity(
+                amount=weekly_active_users, percentage_reference_value=total_users
+            ),
+            monthly_active_users=DetailedStatsEntity(
+                amount=monthly_active_users, percentage_reference_value=total_users
+            ),
+        )
+
 
 class GamePlayersAmountStats(BaseModel):
     total_players: int
@@ -26,27 +83,54 @@ class GamePlayersAmountStats(BaseModel):
     inactive_players: DetailedStatsEntity
     players_online: int
 
+    @classmethod
+    def from_amounts(
+        cls, total_players: int, active_players: int, inactive_players: int, players_online: int
+    ) -> "GamePlayersAmountStats":
+        return cls(
+            total_players=total_players,
+            active_players=DetailedStatsEntity(
+                amount=active_players, percentage_reference_value=total_players
+            ),
+            inactive_players=DetailedStatsEntity(
+                amount=inactive_players, percentage_reference_value=total_players
+            ),
+            players_online=players_online,
+        )
+
 
 class GamePlayersEngagementStats(BaseModel):
     total_games_played: int
     daily_unique_players: int
+    weekly_unique_players: int
+    monthly_unique_players: int
     daily_games_played: int
     weekly_games_played: int
 
 
+# Sections are None when their queries failed or timed out
 class GameStats(BaseModel):
-    players: GamePlayersAmountStats
-    games_in_progress: int
-    engagement: GamePlayersEngagementStats
+    players: GamePlayersAmountStats | None
+    games_in_progress: int | None
+    engagement: GamePlayersEngagementStats | None
 
 
 class AdminStatsResponse(BaseModel):
-    users_amount_stats: UsersAmountStats
-    dynamic_stats: UsersDynamicStats
+    users_amount_stats: UsersAmountStats | None
+    dynamic_stats: UsersDynamicStats | None
+    activity_stats: UsersActivityStats | None
     game_stats: GameStats
 
 
+class AdminOnlineStatsResponse(BaseModel):
+    players_online: int
+    players_online_in_window: int
+    buckets: List[datetime]
+    players_online_history: List[int]
+
+
 class AdminPlotStatsResponse(BaseModel):
+    buckets: List[datetime]
     new_users: List[int]
     blocked_users: List[int]
     users_without_source: List[int]
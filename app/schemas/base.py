@@ -1,9 +1,10 @@
 import datetime
-from typing import Any
+from typing import Any, Tuple
 from urllib.parse import parse_qsl
 
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy import Row
 
 from app.database.models import User, DailyReward, BonusTask, ReferralLink
 from app.typings.enums import UserFarmingStatus, UserLanguage, BonusTaskType
@@ -71,10 +72,10 @@ class UserEntity(BaseModel):
             is_banned=user.is_banned,
             referral_balance=user.referral_balance,
             balance=user.balance,
-            daily_overall_profit=user.daily_overall_profit,
+            daily_overall_profit=user.current_daily_overall_profit,
             farming=FarmingEntity.from_user_model(user),
-            game_energy=user.game_energy,
-            game_daily_highscore=user.game_daily_highscore,
+            game_energy=user.current_game_energy,
+            game_daily_highscore=user.current_game_daily_highscore,
             game_alltime_highscore=user.game_alltime_highscore,
         )
 
@@ -88,12 +89,16 @@ class UserRankingEntity(BaseModel):
     score: int
 
     @classmethod
-    def from_user_model(cls, user: User, ranking_field: str) -> "UserRankingEntity":
+    def from_ranking_row(
+        cls,
+        ranking_row: Row[Tuple[int, str, str | None]],
+        score: int,
+    ) -> "UserRankingEntity":
         return cls(
-            id=user.id,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            score=getattr(user, ranking_field),
+            id=ranking_row.id,
+            first_name=ranking_row.first_name,
+            last_name=ranking_row.last_name,
+            score=score,
         )
 
 
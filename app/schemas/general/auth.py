@@ -91,3 +91,5 @@ class RenewJWTResponse(BaseModel):
 class GameFinishChecksumData(BaseChecksumEntity):
     game_id: str
     score: int
+    ticket: str | None = None
+    events: str | None = None
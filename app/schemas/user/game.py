@@ -5,6 +5,7 @@ from app.schemas.base import UserEntity
 
 class StartGameResponse(BaseModel):
     game_id: str
+    ticket: str
 
 
 class FinishGameResponse(BaseModel):
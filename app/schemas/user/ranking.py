@@ -1,14 +1,18 @@
-from typing import List, Sequence
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error
+from typing import List, Sequence, Tuple
 
-from pydantic import field_validator
+from pydantic import ValidationError, field_validator
+from sqlalchemy import Row
 
-from app.database.models import User
+from app.exceptions.ranking import InvalidRankingCursorError
 from app.schemas.base import (
     UserEntity,
     BaseModel,
     UserRankingEntity,
 )
-from app.typings.consts import RANKING_PLACE_LIMIT
+from app.typings.consts import RANKING_MAX_TOP_PLACE
 
 
 class GetUserRankingInfoResponse(BaseModel):
@@ -18,8 +22,6 @@ class GetUserRankingInfoResponse(BaseModel):
     @field_validator("place", mode="before")
     @classmethod
     def convert_place_to_string(cls, place: int) -> str:
-        if place >= RANKING_PLACE_LIMIT:
-            return f"{RANKING_PLACE_LIMIT // 1000}K+"
         return str(place)
 
 
@@ -34,14 +36,13 @@ class GetRankingChunkResponse(BaseModel):
     @classmethod
     def from_ranking_chunk(
         cls,
-        ranking_chunk: Sequence[User],
+        ranking_chunk: Sequence[UserRankingEntity],
         ranking_offset: int,
-        ranking_field: str,
     ) -> "GetRankingChunkResponse":
         return cls(
             users=[
                 UserRankingInfo(
-                    user=UserRankingEntity.from_user_model(user=user, ranking_field=ranking_field),
+                    user=user,
                     place=ranking_offset + index + 1,
                 )
                 for index, user in enumerate(ranking_chunk)
@@ -49,5 +50,67 @@ class GetRankingChunkResponse(BaseModel):
         )
 
 
+class RankingCursor(BaseModel):
+    score: int
+    first_name: str
+    user_id: int
+    place: int
+
+    def encode(self) -> str:
+        raw_cursor = json.dumps([self.score, self.first_name, self.user_id, self.place])
+
+        return urlsafe_b64encode(raw_cursor.encode("utf-8")).decode("utf-8")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "RankingCursor":
+        try:
+            score, first_name, user_id, place = json.loads(urlsafe_b64decode(cursor))
+            ranking_cursor = cls(score=score, first_name=first_name, user_id=user_id, place=place)
+        except (Error, ValueError, TypeError, ValidationError):
+            raise InvalidRankingCursorError
+
+        # Cursors are issued only inside the top, so any other place was crafted by the client
+        if not 0 <= ranking_cursor.place < RANKING_MAX_TOP_PLACE:
+            raise InvalidRankingCursorError
+
+        return ranking_cursor
+
+    @property
+    def keyset(self) -> Tuple[int, str, int]:
+        return self.score, self.first_name, self.user_id
+
+
+class GetRankingPageResponse(BaseModel):
+    users: List[UserRankingInfo]
+    next_cursor: str | None = None
+
+    @classmethod
+    def from_ranking_page(
+        cls,
+        ranking_page: Sequence[Row[Tuple[int, str, str | None, int]]],
+        ranking_offset: int,
+        page_size: int,
+    ) -> "GetRankingPageResponse":
+        users = [
+            UserRankingInfo(
+                user=UserRankingEntity.from_ranking_row(ranking_row=row, score=row.score),
+                place=ranking_offset + index + 1,
+            )
+            for index, row in enumerate(ranking_page)
+        ]
+        next_cursor = None
+
+        if users and len(users) == page_size and users[-1].place < RANKING_MAX_TOP_PLACE:
+            last_user = users[-1]
+            next_cursor = RankingCursor(
+                score=last_user.user.score,
+                first_name=last_user.user.first_name,
+                user_id=last_user.user.id,
+                place=last_user.place,
+            ).encode()
+
+        return cls(users=users, next_cursor=next_cursor)
+
+
 class FarmingClaimResponse(BaseModel):
     user: UserEntity
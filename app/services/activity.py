@@ -0,0 +1,20 @@
+import datetime
+from typing import Dict, Mapping
+
+
+class ActivityTracker:
+    def __init__(self):
+        self._pending: Dict[int, datetime.datetime] = {}
+
+    def touch(self, user_id: int) -> None:
+        self._pending[user_id] = datetime.datetime.utcnow()
+
+    def drain(self) -> Dict[int, datetime.datetime]:
+        pending, self._pending = self._pending, {}
+
+        return pending
+
+    def restore(self, activities: Mapping[int, datetime.datetime]) -> None:
+        for user_id, seen_at in activities.items():
+            if seen_at > self._pending.get(user_id, datetime.datetime.min):
+                self._pending[user_id] = seen_at
@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from structlog import get_logger
+
+from app.typings.consts import (
+    GAME_REPLAY_PROCESSES,
+    GAME_REPLAY_QUEUE_DEPTH,
+    GAME_REPLAY_TIMEOUT_SECONDS,
+)
+from app.utils.replay import replay_game
+
+logger = get_logger()
+
+
+class GameReplayPool:
+    def __init__(
+        self,
+        processes: int = GAME_REPLAY_PROCESSES,
+        queue_depth: int = GAME_REPLAY_QUEUE_DEPTH,
+        timeout_seconds: float = GAME_REPLAY_TIMEOUT_SECONDS,
+    ):
+        # Spawned workers do not inherit the event loop, sockets and threads of the API process
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._max_pending = processes * queue_depth
+        self._pending = 0
+        self._timeout_seconds = timeout_seconds
+
+    async def replay(self, events: str, duration_ms: int) -> int | None:
+        # None means the replay was not performed and the caller has to fall back
+        if self._pending >= self._max_pending:
+            logger.warning("Game replay pool is overloaded, falling back to heuristics")
+            return None
+
+        try:
+            future = self._executor.submit(replay_game, events, duration_ms)
+        except Exception:
+            logger.exception("Game replay could not be submitted, falling back to heuristics")
+            return None
+
+        # A timed out replay keeps its worker busy, so the slot is released only once it is done
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release_slot))
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=self._timeout_seconds,
+            )
+        except TimeoutError:
+            logger.warning("Game replay timed out, falling back to heuristics")
+            return None
+        except Exception:
+            logger.exception("Game replay failed, falling back to heuristics")
+            return None
+
+    def _release_slot(self) -> None:
+        self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
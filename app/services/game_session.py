@@ -0,0 +1,230 @@
+import datetime
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+
+from redis.asyncio import Redis
+
+from app.database.models import Game
+from app.typings.consts import GAME_SESSION_TTL_SECONDS
+
+# Drops the oldest sessions started before ARGV[1] together with their entries in the index
+REAP_SESSIONS_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, member in ipairs(members) do
+    redis.call('UNLINK', ARGV[2] .. member)
+end
+if #members > 0 then
+    redis.call('ZREM', KEYS[1], unpack(members))
+end
+return #members
+"""
+
+# Moves up to ARGV[1] finished games to the processing list, they leave it once persisted
+TAKE_FINISHED_GAMES_SCRIPT = """
+local raw_games = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #raw_games > 0 then
+    redis.call('RPUSH', KEYS[2], unpack(raw_games))
+    redis.call('LTRIM', KEYS[1], #raw_games, -1)
+end
+return raw_games
+"""
+
+
+class GameSessionStore:
+    KEY_PREFIX = "game-session"
+    FINISHED_GAME_KEY_PREFIX = "finished-game"
+    IN_PROGRESS_KEY = "games-in-progress"
+    FINISHED_GAMES_KEY = "finished-games"
+    PROCESSING_FINISHED_GAMES_KEY = "finished-games:processing"
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl_seconds: int = GAME_SESSION_TTL_SECONDS,
+    ):
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._reap_sessions_script = redis.register_script(REAP_SESSIONS_SCRIPT)
+        self._take_finished_games_script = redis.register_script(TAKE_FINISHED_GAMES_SCRIPT)
+
+    async def start(self, user_id: int) -> Game:
+        game = Game(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            created_at=datetime.datetime.utcnow(),
+        )
+
+        # Abandoned sessions are never persisted, they just expire
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.set(
+                self._get_key(user_id, game.id),
+                game.created_at.isoformat(),
+                ex=self._ttl_seconds,
+            )
+            pipeline.zadd(self.IN_PROGRESS_KEY, {self._get_member(user_id, game.id): time.time()})
+            await pipeline.execute()
+
+        return game
+
+    async def claim(self, user_id: int, game_id: str) -> Game | None:
+        # The key is scoped by user, so a session can be claimed only once and only by its owner
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.getdel(self._get_key(user_id, game_id))
+            pipeline.set(self._get_finished_game_key(game_id), 1, nx=True, ex=self._ttl_seconds)
+            pipeline.zrem(self.IN_PROGRESS_KEY, self._get_member(user_id, game_id))
+            created_at, _, _ = await pipeline.execute()
+
+        if created_at is None:
+            return None
+
+        return Game(
+            id=game_id,
+            user_id=user_id,
+            created_at=datetime.datetime.fromisoformat(created_at.decode("utf-8")),
+        )
+
+    async def claim_ticket(self, game: Game) -> bool:
+        # Ticket is verified by its signature, so only a write is needed to reject replays
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.set(self._get_finished_game_key(game.id), 1, nx=True, ex=self._ttl_seconds)
+            pipeline.unlink(self._get_key(game.user_id, game.id))
+            pipeline.zrem(self.IN_PROGRESS_KEY, self._get_member(game.user_id, game.id))
+            is_claimed, _, _ = await pipeline.execute()
+
+        return bool(is_claimed)
+
+    async def release(self, game: Game) -> None:
+        started_at = game.created_at.replace(tzinfo=datetime.UTC).timestamp()
+
+        # Undoes a claim whose finish was not committed, so the client can finish the game again
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            raw_game = json.dumps(self._dump_finished_game(game))
+            pipeline.lrem(self.FINISHED_GAMES_KEY, 1, raw_game)
+            pipeline.lrem(self.PROCESSING_FINISHED_GAMES_KEY, 1, raw_game)
+            pipeline.set(
+                self._get_key(game.user_id, game.id),
+                game.created_at.isoformat(),
+                ex=max(int(started_at + self._ttl_seconds - time.time()), 1),
+            )
+            pipeline.zadd(
+                self.IN_PROGRESS_KEY, {self._get_member(game.user_id, game.id): started_at}
+            )
+            pipeline.unlink(self._get_finished_game_key(game.id))
+            await pipeline.execute()
+
+    async def count_in_progress(self, abandoned_after_seconds: int) -> int:
+        return await self._redis.zcount(
+            self.IN_PROGRESS_KEY,
+            time.time() - abandoned_after_seconds,
+            "+inf",
+        )
+
+    async def reap_abandoned(self, abandoned_after_seconds: int, batch_size: int) -> int:
+        reaped_amount = await self._reap_sessions_script(
+            keys=[self.IN_PROGRESS_KEY],
+            args=[time.time() - abandoned_after_seconds, f"{self.KEY_PREFIX}:", batch_size],
+        )
+
+        return reaped_amount
+
+    async def reconcile(self, batch_size: int) -> int:
+        stale_members = []
+
+        # Sessions may also vanish on their own (TTL, eviction), leaving entries in the index
+        async for members_batch in self._iterate_in_progress(batch_size):
+            async with self._redis.pipeline(transaction=False) as pipeline:
+                for member in members_batch:
+                    pipeline.exists(f"{self.KEY_PREFIX}:{member.decode('utf-8')}")
+                sessions_exist = await pipeline.execute()
+
+            stale_members.extend(
+                member
+                for member, session_exists in zip(members_batch, sessions_exist)
+                if not session_exists
+            )
+
+        if stale_members:
+            await self._redis.zrem(self.IN_PROGRESS_KEY, *stale_members)
+
+        return len(stale_members)
+
+    async def enqueue_finished(self, *games: Game) -> None:
+        if not games:
+            return
+
+        await self._redis.rpush(
+            self.FINISHED_GAMES_KEY,
+            *[json.dumps(self._dump_finished_game(game)) for game in games],
+        )
+
+    async def take_finished(self, batch_size: int) -> List[Game]:
+        # Games left by a flush that failed or crashed are taken again before any new ones
+        raw_games = await self._redis.lrange(self.PROCESSING_FINISHED_GAMES_KEY, 0, batch_size - 1)
+
+        if not raw_games:
+            raw_games = await self._take_finished_games_script(
+                keys=[self.FINISHED_GAMES_KEY, self.PROCESSING_FINISHED_GAMES_KEY],
+                args=[batch_size],
+            )
+
+        return [self._load_finished_game(json.loads(raw_game)) for raw_game in raw_games]
+
+    async def acknowledge_finished(self, *games: Game) -> None:
+        if not games:
+            return
+
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for game in games:
+                pipeline.lrem(
+                    self.PROCESSING_FINISHED_GAMES_KEY,
+                    1,
+                    json.dumps(self._dump_finished_game(game)),
+                )
+            await pipeline.execute()
+
+    async def _iterate_in_progress(self, batch_size: int) -> AsyncIterator[List[bytes]]:
+        cursor = 0
+
+        while True:
+            cursor, members_with_scores = await self._redis.zscan(
+                self.IN_PROGRESS_KEY,
+                cursor=cursor,
+                count=batch_size,
+            )
+            if members_with_scores:
+                yield [member for member, _ in members_with_scores]
+
+            if cursor == 0:
+                break
+
+    def _get_key(self, user_id: int, game_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{self._get_member(user_id, game_id)}"
+
+    def _get_finished_game_key(self, game_id: str) -> str:
+        return f"{self.FINISHED_GAME_KEY_PREFIX}:{game_id}"
+
+    def _get_member(self, user_id: int, game_id: str) -> str:
+        return f"{user_id}:{game_id}"
+
+    def _dump_finished_game(self, game: Game) -> Dict[str, Any]:
+        return {
+            "id": game.id,
+            "user_id": game.user_id,
+            "score": game.score,
+            "marked_as_suspicious": game.marked_as_suspicious,
+            "on_fraud_check": game.on_fraud_check,
+            "created_at": game.created_at.isoformat(),
+            "finished_at": game.finished_at.isoformat(),  # type: ignore[union-attr]
+        }
+
+    def _load_finished_game(self, snapshot: Dict[str, Any]) -> Game:
+        return Game(
+            **{
+                **snapshot,
+                "created_at": datetime.datetime.fromisoformat(snapshot["created_at"]),
+                "finished_at": datetime.datetime.fromisoformat(snapshot["finished_at"]),
+            }
+        )
+
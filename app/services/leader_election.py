@@ -0,0 +1,115 @@
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from structlog import get_logger
+
+from app.typings.consts import SCHEDULER_LEASE_TTL_SECONDS, SCHEDULER_MISSED_JOB_TOLERANCE_SECONDS
+
+logger = get_logger()
+
+# Extends the lease when it is already held by this candidate, otherwise tries to take it
+ACQUIRE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    KEY = "scheduler-leader"
+    DUE_JOBS_KEY = "scheduler-jobs:due"
+    DONE_JOBS_KEY = "scheduler-jobs:done"
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl_seconds: int = SCHEDULER_LEASE_TTL_SECONDS,
+        missed_job_tolerance_seconds: int = SCHEDULER_MISSED_JOB_TOLERANCE_SECONDS,
+    ):
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._missed_job_tolerance_seconds = missed_job_tolerance_seconds
+        self._tracked_jobs: Dict[str, Tuple[Callable[..., Awaitable[Any]], Dict[str, Any]]] = {}
+        self._candidate_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._lease_valid_until = 0.0
+        self._acquire_lease_script = redis.register_script(ACQUIRE_LEASE_SCRIPT)
+        self._release_lease_script = redis.register_script(RELEASE_LEASE_SCRIPT)
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._lease_valid_until
+
+    async def renew(self) -> None:
+        requested_at = time.monotonic()
+        was_leader = self.is_leader
+
+        try:
+            acquired = await self._acquire_lease_script(
+                keys=[self.KEY],
+                args=[self._candidate_id, self._ttl_seconds * 1000],
+            )
+        except RedisError:
+            logger.exception("Could not renew scheduler lease")
+            acquired = False
+
+        # Counted from the moment of request, so the local view expires before the lease does
+        self._lease_valid_until = requested_at + self._ttl_seconds if acquired else 0.0
+
+        if self.is_leader != was_leader:
+            logger.info(f"Scheduler leadership changed, is leader: {self.is_leader}")
+
+    async def release(self) -> None:
+        self._lease_valid_until = 0.0
+        await self._release_lease_script(keys=[self.KEY], args=[self._candidate_id])
+
+    def track(self, job: Callable[..., Awaitable[Any]], **kwargs) -> None:
+        self._tracked_jobs[job.__name__] = (job, kwargs)
+
+    async def run(self, job: Callable[..., Awaitable[Any]], **kwargs) -> None:
+        is_tracked = job.__name__ in self._tracked_jobs
+
+        if self.is_leader:
+            if is_tracked:
+                await self._redis.hset(self.DONE_JOBS_KEY, job.__name__, time.time())
+            await job(**kwargs)
+        elif is_tracked:
+            # Remembered for the case there is no leader now, e.g. during a failover
+            await self._redis.hset(self.DUE_JOBS_KEY, job.__name__, time.time())
+
+    async def run_missed(self) -> None:
+        if not self.is_leader or not self._tracked_jobs:
+            return
+
+        jobs_names = list(self._tracked_jobs)
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            pipeline.hmget(self.DUE_JOBS_KEY, jobs_names)
+            pipeline.hmget(self.DONE_JOBS_KEY, jobs_names)
+            due_at, done_at = await pipeline.execute()
+
+        for job_name, job_due_at, job_done_at in zip(jobs_names, due_at, done_at):
+            if job_due_at is None:
+                continue
+
+            # Non-leaders mark the same fire times the leader runs, so only a late mark counts
+            if float(job_due_at) - float(job_done_at or 0) <= self._missed_job_tolerance_seconds:
+                continue
+
+            logger.info(f"Running missed cluster job {job_name}")
+            job, kwargs = self._tracked_jobs[job_name]
+            await self.run(job, **kwargs)
@@ -0,0 +1,152 @@
+from itertools import chain
+from typing import Any, AsyncIterator, Dict, Iterator, Sequence, Tuple
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.database.models import User
+from app.typings.consts import (
+    DAILY_LEADERBOARD_TTL_SECONDS,
+    DAILY_RANKING_FIELDS,
+    LEADERBOARD_REBUILD_TIMEOUT_SECONDS,
+    MONOTONIC_RANKING_FIELDS,
+    RANKING_FIELDS,
+)
+from app.utils.dt import get_daily_epoch
+from app.utils.ranking import get_ranking_score_attribute
+
+# Adds the member with the provided fallback score when it is missing,
+# then counts members ranked at or above it (ties share the lowest place)
+GET_PLACE_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    if tonumber(ARGV[3]) > 0 and redis.call('TTL', KEYS[1]) == -1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+    end
+    score = ARGV[2]
+end
+return {score, redis.call('ZCOUNT', KEYS[1], score, '+inf')}
+"""
+
+# Adds the scores to the leaderboard and, while it is being rebuilt, to its rebuild copy too.
+# ARGV[1] is an optional ZADD flag, ARGV[2] is a TTL to set (0 for none), the rest are pairs
+UPDATE_SCORES_SCRIPT = """
+local keys = {KEYS[2]}
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    table.insert(keys, KEYS[3])
+end
+for _, key in ipairs(keys) do
+    if ARGV[1] == '' then
+        redis.call('ZADD', key, unpack(ARGV, 3))
+    else
+        redis.call('ZADD', key, ARGV[1], unpack(ARGV, 3))
+    end
+    if tonumber(ARGV[2]) > 0 then
+        redis.call('EXPIRE', key, ARGV[2])
+    end
+end
+return #keys
+"""
+
+
+class Leaderboard:
+    KEY_PREFIX = "leaderboard"
+    REBUILD_KEY_SUFFIX = ":rebuild"
+    REBUILD_MARKER_KEY = "leaderboard-rebuild"
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+        self._get_place_script = redis.register_script(GET_PLACE_SCRIPT)
+        self._update_scores_script = redis.register_script(UPDATE_SCORES_SCRIPT)
+
+    async def update(self, *users: User) -> None:
+        if not users:
+            return
+
+        # Callbacks of concurrent commits may run in any order, so growing scores never go down
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for ranking_field, scores in self._get_scores(users):
+                key = self._get_key(ranking_field)
+                is_daily = ranking_field in DAILY_RANKING_FIELDS
+
+                await self._update_scores_script(
+                    keys=[self.REBUILD_MARKER_KEY, key, key + self.REBUILD_KEY_SUFFIX],
+                    args=[
+                        "GT" if ranking_field in MONOTONIC_RANKING_FIELDS else "",
+                        DAILY_LEADERBOARD_TTL_SECONDS if is_daily else 0,
+                        *chain.from_iterable((score, user_id) for user_id, score in scores.items()),
+                    ],
+                    client=pipeline,
+                )
+            await pipeline.execute()
+
+    async def get_place(self, ranking_field: str, user: User) -> Tuple[int, int]:
+        is_daily = ranking_field in DAILY_RANKING_FIELDS
+
+        score, place = await self._get_place_script(
+            keys=[self._get_key(ranking_field)],
+            args=[
+                user.id,
+                getattr(user, get_ranking_score_attribute(ranking_field)),
+                DAILY_LEADERBOARD_TTL_SECONDS if is_daily else 0,
+            ],
+        )
+
+        return int(place), int(float(score))
+
+    async def rebuild(self, users_batches: AsyncIterator[Sequence[Any]]) -> None:
+        rebuild_keys = [self._get_key(field) + self.REBUILD_KEY_SUFFIX for field in RANKING_FIELDS]
+
+        # Set before the users are read, so every later commit's update reaches the copies too
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.delete(*rebuild_keys)
+            pipeline.set(self.REBUILD_MARKER_KEY, 1, ex=LEADERBOARD_REBUILD_TIMEOUT_SECONDS)
+            await pipeline.execute()
+
+        async for users in users_batches:
+            async with self._redis.pipeline(transaction=False) as pipeline:
+                self._add_rebuilt_scores(pipeline, users)
+                await pipeline.execute()
+
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            for ranking_field, rebuild_key in zip(RANKING_FIELDS, rebuild_keys, strict=True):
+                if await self._redis.exists(rebuild_key):
+                    pipeline.rename(rebuild_key, self._get_key(ranking_field))
+                else:
+                    pipeline.delete(self._get_key(ranking_field))
+            pipeline.delete(self.REBUILD_MARKER_KEY)
+            await pipeline.execute()
+
+    def _add_rebuilt_scores(self, pipeline: Pipeline, users: Sequence[Any]) -> None:
+        for ranking_field, scores in self._get_scores(users):
+            key = self._get_key(ranking_field) + self.REBUILD_KEY_SUFFIX
+
+            # Streamed rows may be older than the updates written to the copy meanwhile
+            if ranking_field in MONOTONIC_RANKING_FIELDS:
+                pipeline.zadd(key, scores, gt=True)
+            else:
+                pipeline.zadd(key, scores, nx=True)
+
+            if ranking_field in DAILY_RANKING_FIELDS:
+                pipeline.expire(key, DAILY_LEADERBOARD_TTL_SECONDS)
+
+    def _get_scores(self, users: Sequence[Any]) -> Iterator[Tuple[str, Dict[str, int]]]:
+        for ranking_field in RANKING_FIELDS:
+            score_attribute = get_ranking_score_attribute(ranking_field)
+            scores = {str(user.id): getattr(user, score_attribute) for user in users}
+
+            if ranking_field in DAILY_RANKING_FIELDS:
+                # Daily counters never decrease, users without progress are ranked lazily
+                scores = {user_id: score for user_id, score in scores.items() if score > 0}
+
+                if not scores:
+                    continue
+
+            yield ranking_field, scores
+
+    def _get_key(self, ranking_field: str) -> str:
+        if ranking_field in DAILY_RANKING_FIELDS:
+            return f"{self.KEY_PREFIX}:{ranking_field}:{get_daily_epoch().isoformat()}"
+
+        return f"{self.KEY_PREFIX}:{ranking_field}"
@@ -0,0 +1,193 @@
+from typing import List, Sequence, Tuple
+
+from redis.asyncio import Redis
+
+from app.typings.consts import (
+    LIVE_METRICS_PERIODS_TTL_SECONDS,
+    LIVE_METRICS_REBUILD_TIMEOUT_SECONDS,
+)
+from app.utils.dt import get_client_side_date
+
+# Counts the registration once the counter is seeded, and journals it while a rebuild is running
+REGISTER_USER_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCR', KEYS[1])
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RPUSH', KEYS[3], 'r')
+    redis.call('PEXPIRE', KEYS[3], redis.call('PTTL', KEYS[2]))
+end
+"""
+
+# ARGV[1] is '+' to block the user ARGV[2] or '-' to unblock, journaled while a rebuild is running
+UPDATE_BLOCKED_USER_SCRIPT = """
+if ARGV[1] == '+' then
+    redis.call('SADD', KEYS[1], ARGV[2])
+else
+    redis.call('SREM', KEYS[1], ARGV[2])
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RPUSH', KEYS[3], ARGV[1] .. ARGV[2])
+    redis.call('PEXPIRE', KEYS[3], redis.call('PTTL', KEYS[2]))
+end
+"""
+
+# Replays changes made since the rebuild started on top of the snapshot, then swaps it in.
+# A rebuild outliving its lock has an incomplete journal, so it is dropped instead
+FINISH_USERS_REBUILD_SCRIPT = """
+if redis.call('EXISTS', KEYS[5]) == 0 then
+    redis.call('UNLINK', KEYS[3], KEYS[4])
+    return 0
+end
+local total_users = tonumber(ARGV[1])
+for _, entry in ipairs(redis.call('LRANGE', KEYS[4], 0, -1)) do
+    local operation, user_id = string.sub(entry, 1, 1), string.sub(entry, 2)
+    if operation == '+' then
+        redis.call('SADD', KEYS[3], user_id)
+    elseif operation == '-' then
+        redis.call('SREM', KEYS[3], user_id)
+    else
+        total_users = total_users + 1
+    end
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('RENAME', KEYS[3], KEYS[2])
+else
+    redis.call('UNLINK', KEYS[2])
+end
+redis.call('SET', KEYS[1], total_users)
+redis.call('UNLINK', KEYS[4], KEYS[5])
+return 1
+"""
+
+
+class LiveMetrics:
+    TOTAL_USERS_KEY = "live-metrics:total-users"
+    BLOCKED_USERS_KEY = "live-metrics:blocked-users"
+    BLOCKED_USERS_REBUILD_KEY = "live-metrics:blocked-users:rebuild"
+    USERS_REBUILD_JOURNAL_KEY = "live-metrics:users-rebuild:journal"
+    USERS_REBUILD_LOCK_KEY = "live-metrics:users-rebuild:lock"
+    ACTIVE_USERS_KEY_PREFIX = "live-metrics:active-users"
+    PLAYERS_KEY_PREFIX = "live-metrics:players"
+
+    def __init__(
+        self,
+        redis: Redis,
+        periods_ttl_seconds: Tuple[int, int, int] = LIVE_METRICS_PERIODS_TTL_SECONDS,
+        rebuild_timeout_seconds: int = LIVE_METRICS_REBUILD_TIMEOUT_SECONDS,
+    ):
+        self._redis = redis
+        self._periods_ttl_seconds = periods_ttl_seconds
+        self._rebuild_timeout_seconds = rebuild_timeout_seconds
+        self._register_user_script = redis.register_script(REGISTER_USER_SCRIPT)
+        self._update_blocked_user_script = redis.register_script(UPDATE_BLOCKED_USER_SCRIPT)
+        self._finish_users_rebuild_script = redis.register_script(FINISH_USERS_REBUILD_SCRIPT)
+
+    async def register_user(self) -> None:
+        await self._register_user_script(
+            keys=[
+                self.TOTAL_USERS_KEY,
+                self.USERS_REBUILD_LOCK_KEY,
+                self.USERS_REBUILD_JOURNAL_KEY,
+            ],
+        )
+
+    # Blocked users are kept as a set, so repeated blocks and unblocks are not counted twice
+    async def block_user(self, user_id: int) -> None:
+        await self._update_blocked_user("+", user_id)
+
+    async def unblock_user(self, user_id: int) -> None:
+        await self._update_blocked_user("-", user_id)
+
+    async def get_users_amounts(self) -> Tuple[int, int, int] | None:
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            pipeline.get(self.TOTAL_USERS_KEY)
+            pipeline.scard(self.BLOCKED_USERS_KEY)
+            total_users, inactive_users = await pipeline.execute()
+
+        # Counters are unknown until the first rebuild seeds them
+        if total_users is None:
+            return None
+
+        total_users = int(total_users)
+
+        return total_users, total_users - inactive_users, inactive_users
+
+    async def track_active_users(self, *user_ids: int) -> None:
+        await self._track(self.ACTIVE_USERS_KEY_PREFIX, user_ids)
+
+    async def track_players(self, *user_ids: int) -> None:
+        await self._track(self.PLAYERS_KEY_PREFIX, user_ids)
+
+    async def get_active_users_amounts(self) -> Tuple[int, int, int]:
+        return await self._count(self.ACTIVE_USERS_KEY_PREFIX)
+
+    async def get_players_amounts(self) -> Tuple[int, int, int]:
+        return await self._count(self.PLAYERS_KEY_PREFIX)
+
+    async def start_users_rebuild(self) -> None:
+        # Must precede reading the snapshot, so every change made after it gets journaled
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.unlink(self.BLOCKED_USERS_REBUILD_KEY, self.USERS_REBUILD_JOURNAL_KEY)
+            pipeline.set(self.USERS_REBUILD_LOCK_KEY, 1, ex=self._rebuild_timeout_seconds)
+            await pipeline.execute()
+
+    async def add_rebuilt_blocked_users(self, *user_ids: int) -> None:
+        if user_ids:
+            await self._redis.sadd(self.BLOCKED_USERS_REBUILD_KEY, *user_ids)
+
+    async def finish_users_rebuild(self, total_users: int) -> bool:
+        is_finished = await self._finish_users_rebuild_script(
+            keys=[
+                self.TOTAL_USERS_KEY,
+                self.BLOCKED_USERS_KEY,
+                self.BLOCKED_USERS_REBUILD_KEY,
+                self.USERS_REBUILD_JOURNAL_KEY,
+                self.USERS_REBUILD_LOCK_KEY,
+            ],
+            args=[total_users],
+        )
+
+        return bool(is_finished)
+
+    async def _update_blocked_user(self, operation: str, user_id: int) -> None:
+        await self._update_blocked_user_script(
+            keys=[
+                self.BLOCKED_USERS_KEY,
+                self.USERS_REBUILD_LOCK_KEY,
+                self.USERS_REBUILD_JOURNAL_KEY,
+            ],
+            args=[operation, user_id],
+        )
+
+    async def _track(self, key_prefix: str, user_ids: Sequence[int]) -> None:
+        if not user_ids:
+            return
+
+        period_keys = self._get_period_keys(key_prefix)
+
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for key, ttl_seconds in zip(period_keys, self._periods_ttl_seconds):
+                pipeline.pfadd(key, *user_ids)
+                pipeline.expire(key, ttl_seconds)
+            await pipeline.execute()
+
+    async def _count(self, key_prefix: str) -> Tuple[int, int, int]:
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for key in self._get_period_keys(key_prefix):
+                pipeline.pfcount(key)
+            daily, weekly, monthly = await pipeline.execute()
+
+        return daily, weekly, monthly
+
+    # Periods follow the client side calendar, like the rest of the admin stats
+    @staticmethod
+    def _get_period_keys(key_prefix: str) -> List[str]:
+        today = get_client_side_date()
+        iso_year, iso_week, _ = today.isocalendar()
+
+        return [
+            f"{key_prefix}:day:{today.isoformat()}",
+            f"{key_prefix}:week:{iso_year}-W{iso_week:02d}",
+            f"{key_prefix}:month:{today.strftime('%Y-%m')}",
+        ]
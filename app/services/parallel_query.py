@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog import get_logger
+
+from app.typings.consts import PARALLEL_QUERY_TIMEOUT_SECONDS
+
+logger = get_logger()
+
+
+class ParallelQueryExecutor:
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        timeout_seconds: float = PARALLEL_QUERY_TIMEOUT_SECONDS,
+    ):
+        self._sessionmaker = sessionmaker
+        self._timeout_seconds = timeout_seconds
+
+    # Queries must be independent and read-only, each one gets its own session and connection.
+    # A failed or timed out query yields None, so the caller can still serve partial results
+    async def run(self, **queries: Callable[[AsyncSession], Awaitable[Any]]) -> Dict[str, Any]:
+        results = await asyncio.gather(
+            *(self._run_query(name, query) for name, query in queries.items())
+        )
+
+        return dict(zip(queries, results))
+
+    async def _run_query(
+        self,
+        name: str,
+        query: Callable[[AsyncSession], Awaitable[Any]],
+    ) -> Any:
+        try:
+            async with self._sessionmaker() as session:
+                return await asyncio.wait_for(query(session), timeout=self._timeout_seconds)
+        except TimeoutError:
+            logger.warning(f"Parallel query {name} timed out")
+        except Exception:
+            logger.exception(f"Parallel query {name} failed")
+
+        return None
@@ -0,0 +1,83 @@
+import time
+from datetime import UTC, datetime
+from typing import List, Mapping, Tuple
+
+from redis.asyncio import Redis
+
+from app.typings.consts import (
+    PRESENCE_HISTORY_INTERVAL_SECONDS,
+    PRESENCE_HISTORY_RETENTION_SECONDS,
+    PRESENCE_ONLINE_WINDOW_SECONDS,
+    PRESENCE_RETENTION_SECONDS,
+)
+
+
+class PresenceTracker:
+    LAST_SEEN_KEY = "presence:last-seen"
+    HISTORY_KEY = "presence:history"
+
+    def __init__(
+        self,
+        redis: Redis,
+        online_window_seconds: int = PRESENCE_ONLINE_WINDOW_SECONDS,
+        retention_seconds: int = PRESENCE_RETENTION_SECONDS,
+        history_interval_seconds: int = PRESENCE_HISTORY_INTERVAL_SECONDS,
+        history_retention_seconds: int = PRESENCE_HISTORY_RETENTION_SECONDS,
+    ):
+        self._redis = redis
+        self._online_window_seconds = online_window_seconds
+        self._retention_seconds = retention_seconds
+        self._history_interval_seconds = history_interval_seconds
+        self._history_retention_seconds = history_retention_seconds
+
+    async def touch(self, activities: Mapping[int, datetime]) -> None:
+        if not activities:
+            return
+
+        # Activities of different workers may arrive out of order, so only newer scores are kept
+        await self._redis.zadd(
+            self.LAST_SEEN_KEY,
+            {
+                str(user_id): seen_at.replace(tzinfo=UTC).timestamp()
+                for user_id, seen_at in activities.items()
+            },
+            gt=True,
+        )
+
+    async def count_online(self, window_seconds: int | None = None) -> int:
+        window_seconds = window_seconds or self._online_window_seconds
+
+        return await self._redis.zcount(self.LAST_SEEN_KEY, time.time() - window_seconds, "+inf")
+
+    async def record_history(self) -> int:
+        now = time.time()
+        minute = int(now // self._history_interval_seconds * self._history_interval_seconds)
+
+        # Members carry the amount, so a repeated run for the same minute replaces its point
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.zremrangebyscore(self.LAST_SEEN_KEY, "-inf", now - self._retention_seconds)
+            pipeline.zcount(self.LAST_SEEN_KEY, now - self._online_window_seconds, "+inf")
+            _, online = await pipeline.execute()
+
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.zremrangebyscore(self.HISTORY_KEY, minute, minute)
+            pipeline.zadd(self.HISTORY_KEY, {f"{minute}:{online}": minute})
+            pipeline.zremrangebyscore(
+                self.HISTORY_KEY, "-inf", now - self._history_retention_seconds
+            )
+            await pipeline.execute()
+
+        return online
+
+    async def get_history(self, period_seconds: int) -> Tuple[List[datetime], List[int]]:
+        points = await self._redis.zrangebyscore(
+            self.HISTORY_KEY, time.time() - period_seconds, "+inf"
+        )
+
+        buckets, online = [], []
+        for point in points:
+            minute, _, amount = point.decode("utf-8").partition(":")
+            buckets.append(datetime.fromtimestamp(int(minute), tz=UTC).replace(tzinfo=None))
+            online.append(int(amount))
+
+        return buckets, online
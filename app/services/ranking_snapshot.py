@@ -0,0 +1,46 @@
+import hashlib
+from typing import Mapping, Tuple
+
+from redis.asyncio import Redis
+
+from app.typings.consts import RANKING_SNAPSHOT_TTL_SECONDS
+
+
+class RankingSnapshotStore:
+    KEY_PREFIX = "ranking-snapshot"
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl_seconds: int = RANKING_SNAPSHOT_TTL_SECONDS,
+    ):
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+
+    async def publish(self, ranking_field: str, chunks: Mapping[int, bytes]) -> None:
+        snapshot = {}
+
+        for offset, body in chunks.items():
+            snapshot[str(offset)] = body
+            snapshot[f"{offset}:etag"] = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        key = self._get_key(ranking_field)
+
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.hset(key, mapping=snapshot)  # type: ignore[arg-type]
+            pipeline.expire(key, self._ttl_seconds)
+            await pipeline.execute()
+
+    async def get_chunk(self, ranking_field: str, offset: int) -> Tuple[bytes, str] | None:
+        body, etag = await self._redis.hmget(
+            self._get_key(ranking_field),
+            [str(offset), f"{offset}:etag"],
+        )
+
+        if body is None or etag is None:
+            return None
+
+        return body, etag.decode("utf-8")
+
+    def _get_key(self, ranking_field: str) -> str:
+        return f"{self.KEY_PREFIX}:{ranking_field}"
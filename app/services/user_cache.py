@@ -0,0 +1,103 @@
+import datetime
+import json
+from typing import Any, Dict
+
+from redis.asyncio import Redis
+from sqlalchemy import Date, DateTime, Enum, inspect
+
+from app.database.models import User
+from app.typings.consts import USER_CACHE_TTL_SECONDS
+
+# Stores the snapshot only if no invalidation happened since its row was read from the database
+FILL_SNAPSHOT_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or 0) ~= tonumber(ARGV[1]) then
+    return 0
+end
+if redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[3]) then
+    return 1
+end
+return 0
+"""
+
+
+class UserCache:
+    KEY_PREFIX = "user-snapshot"
+    VERSION_KEY_PREFIX = "user-snapshot-version"
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl_seconds: int = USER_CACHE_TTL_SECONDS,
+    ):
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._columns = inspect(User).columns
+        self._fill_snapshot_script = redis.register_script(FILL_SNAPSHOT_SCRIPT)
+
+    async def get(self, user_id: int) -> User | None:
+        raw_snapshot = await self._redis.get(self._get_key(user_id))
+
+        if raw_snapshot is None:
+            return None
+
+        return self._load_snapshot(json.loads(raw_snapshot))
+
+    async def get_version(self, user_id: int) -> int:
+        # Must be read before the row, so an invalidation racing with the read is noticed
+        return int(await self._redis.get(self._get_version_key(user_id)) or 0)
+
+    async def fill(self, user: User, version: int) -> None:
+        await self._fill_snapshot_script(
+            keys=[self._get_key(user.id), self._get_version_key(user.id)],
+            args=[version, json.dumps(self._dump_snapshot(user)), self._ttl_seconds],
+        )
+
+    async def invalidate(self, *user_ids: int) -> None:
+        if not user_ids:
+            return
+
+        # Bumped versions reject fills of rows read before the invalidating commit
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.unlink(*[self._get_key(user_id) for user_id in user_ids])
+            for user_id in user_ids:
+                pipeline.incr(self._get_version_key(user_id))
+                pipeline.expire(self._get_version_key(user_id), self._ttl_seconds)
+            await pipeline.execute()
+
+    def _get_key(self, user_id: int) -> str:
+        return f"{self.KEY_PREFIX}:{user_id}"
+
+    def _get_version_key(self, user_id: int) -> str:
+        return f"{self.VERSION_KEY_PREFIX}:{user_id}"
+
+    def _dump_snapshot(self, user: User) -> Dict[str, Any]:
+        snapshot = {}
+
+        for column in self._columns:
+            value = getattr(user, column.key)
+
+            if isinstance(value, datetime.date):
+                value = value.isoformat()
+
+            snapshot[column.key] = value
+
+        return snapshot
+
+    def _load_snapshot(self, snapshot: Dict[str, Any]) -> User:
+        values = {}
+
+        for column in self._columns:
+            value = snapshot.get(column.key)
+
+            if value is not None:
+                if isinstance(column.type, DateTime):
+                    value = datetime.datetime.fromisoformat(value)
+                elif isinstance(column.type, Date):
+                    value = datetime.date.fromisoformat(value)
+                elif isinstance(column.type, Enum) and column.type.enum_class is not None:
+                    value = column.type.enum_class(value)
+
+            values[column.key] = value
+
+        # Detached instance: handlers must use rows returned by repository updates
+        return User(**values)
@@ -1,12 +1,14 @@
-from typing import List
+import datetime
+from typing import Any, Awaitable, Callable, Dict, List
 
 import sentry_sdk
 from apscheduler.executors.asyncio import AsyncIOExecutor  # type: ignore[import-untyped]
+from apscheduler.job import Job  # type: ignore[import-untyped]
 from apscheduler.schedulers.asyncio import AsyncIOScheduler  # type: ignore[import-untyped]
 from apscheduler.triggers.cron import CronTrigger  # type: ignore[import-untyped]
 from apscheduler.triggers.interval import IntervalTrigger  # type: ignore[import-untyped]
 from authlib.common.errors import AuthlibBaseError  # type: ignore[import-untyped]
-from dishka import make_async_container
+from dishka import AsyncContainer, make_async_container
 from dishka.integrations.fastapi import setup_dishka
 from dishka.provider import BaseProvider
 from fastapi import FastAPI
@@ -15,11 +17,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
 from app.config import Config, config
-from app.cron.account import reset_overall_profit
-from app.cron.game import reset_game_energy, reset_game_highscore
+from app.cron.account import flush_users_activity, settle_referral_rewards
+from app.cron.game import (
+    flush_finished_games,
+    maintain_games_partitions,
+    reap_abandoned_games,
+    reconcile_games_in_progress,
+    review_suspicious_games,
+)
+from app.cron.ranking import publish_ranking_snapshots
+from app.cron.referrals import rebuild_referral_stats
+from app.cron.stats import (
+    close_out_daily_stats,
+    reconcile_live_metrics,
+    record_presence_history,
+)
 from app.di.providers.auth import JWTManagerProvider
 from app.di.providers.database import RepositoriesProvider, ConnectionProvider
 from app.di.providers.redis import RedisProvider
+from app.di.providers.services import ServicesProvider
 from app.di.providers.webapp import WebAppProvider
 from app.exceptions.auth import InitDataAuthError
 from app.exceptions.bonus_tasks import BonusTaskUncompletedError
@@ -30,6 +46,8 @@ from app.exceptions.database import (
     DBActionNotAllowedError,
 )
 from app.exceptions.game import GameStartImpossibleError
+from app.exceptions.ranking import InvalidRankingCursorError
+from app.exceptions.stats import InvalidStatsPlotRangeError
 from app.handlers.general.exceptions import (
     record_already_exists_exception_handler,
     record_not_found_exception_handler,
@@ -40,9 +58,44 @@ from app.handlers.general.exceptions import (
     authlib_error_exception_handler,
     bonus_task_uncompleted_exception_handler,
     game_start_impossible_exception_handler,
+    invalid_ranking_cursor_exception_handler,
+    invalid_stats_plot_range_exception_handler,
 )
 from app.handlers.routes import user_router, admin_router
 from app.handlers.user.account import jwt_auth
+from app.services.activity import ActivityTracker
+from app.services.game_session import GameSessionStore
+from app.services.leader_election import LeaderElection
+from app.services.live_metrics import LiveMetrics
+from app.services.presence import PresenceTracker
+from app.services.ranking_snapshot import RankingSnapshotStore
+from app.services.user_cache import UserCache
+from app.typings.consts import (
+    ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    CLIENT_SIDE_TIMEZONE,
+    DAILY_STATS_REWRITE_DAYS,
+    FINISHED_GAMES_FLUSH_BATCH_SIZE,
+    FRAUD_REVIEW_FETCH_BATCH_SIZE,
+    FRAUD_REVIEW_HISTORY_DAYS,
+    FRAUD_REVIEW_INTERVAL_SECONDS,
+    FRAUD_REVIEW_WINDOW_DAYS,
+    FRAUD_REVIEW_WRITE_BATCH_SIZE,
+    FINISHED_GAMES_FLUSH_INTERVAL_SECONDS,
+    GAMES_ABANDONED_AFTER_SECONDS,
+    GAMES_IN_PROGRESS_RECONCILE_INTERVAL_SECONDS,
+    GAMES_PARTITIONS_PREMAKE_MONTHS,
+    GAMES_REAP_BATCH_SIZE,
+    GAMES_REAP_INTERVAL_SECONDS,
+    GAMES_RETENTION_MONTHS,
+    LIVE_METRICS_RECONCILE_BATCH_SIZE,
+    PRESENCE_HISTORY_INTERVAL_SECONDS,
+    RANKING_SNAPSHOT_INTERVAL_SECONDS,
+    REFERRAL_REWARDS_SETTLE_BATCH_SIZE,
+    REFERRAL_REWARDS_SETTLE_INTERVAL_SECONDS,
+    SCHEDULER_LEASE_RENEW_INTERVAL_SECONDS,
+    SCHEDULER_MISFIRE_GRACE_SECONDS,
+    SCHEDULER_MISSED_JOBS_CHECK_INTERVAL_SECONDS,
+)
 from app.utils.auth import JWTAuth
 from app.utils.logs import SetupLogger, LoggerReg
 
@@ -75,6 +128,8 @@ def setup_exception_handlers(app: FastAPI):
         db_action_not_allowed_exception_handler: DBActionNotAllowedError,
         daily_reward_already_claimed_exception_handler: DailyRewardAlreadyClaimedError,
         game_start_impossible_exception_handler: GameStartImpossibleError,
+        invalid_ranking_cursor_exception_handler: InvalidRankingCursorError,
+        invalid_stats_plot_range_exception_handler: InvalidStatsPlotRangeError,
     }
     for handler, error in error_handlers.items():
         app.add_exception_handler(error, handler)  # type: ignore[arg-type]
@@ -89,6 +144,7 @@ def setup_dependencies(
         JWTManagerProvider(),
         WebAppProvider(),
         RedisProvider(),
+        ServicesProvider(),
     ]
 
     container = make_async_container(
@@ -112,31 +168,209 @@ def setup_logging():
     )
 
 
-def setup_scheduler(
-    sessionmaker: async_sessionmaker[AsyncSession],
+def add_daily_cluster_job(
+    scheduler: AsyncIOScheduler,
+    leader_election: LeaderElection,
+    job: Callable[..., Awaitable[Any]],
+    kwargs: Dict[str, Any],
+    trigger: CronTrigger,
+) -> Job:
+    leader_election.track(job, **kwargs)
+
+    return scheduler.add_job(
+        leader_election.run,
+        args=[job],
+        kwargs=kwargs,
+        trigger=trigger,
+        id=job.__name__,
+    )
+
+
+async def setup_scheduler(
+    container: AsyncContainer,
+    run_cluster_jobs: bool = True,
+    run_worker_jobs: bool = True,
 ):
+    sessionmaker = await container.get(async_sessionmaker[AsyncSession])
+    leader_election = await container.get(LeaderElection)
+    live_metrics = await container.get(LiveMetrics)
+    presence_tracker = await container.get(PresenceTracker)
+
     scheduler = AsyncIOScheduler(
         executors={"default": AsyncIOExecutor()},
-    )
-    scheduler.add_job(
-        reset_game_energy,
-        kwargs={"sessionmaker": sessionmaker},
-        trigger=CronTrigger(hour=0, minute=0, timezone="UTC"),
-        id="reset_game_energy",
+        # A busy event loop delays jobs by more than the default grace second
+        job_defaults={"misfire_grace_time": SCHEDULER_MISFIRE_GRACE_SECONDS, "coalesce": True},
     )
 
-    scheduler.add_job(
-        reset_game_highscore,
-        kwargs={"sessionmaker": sessionmaker},
-        trigger=CronTrigger(hour=0, minute=0, timezone="UTC"),
-        id="reset_daily_highscore",
-    )
+    if run_cluster_jobs:
+        user_cache = await container.get(UserCache)
+        ranking_snapshot_store = await container.get(RankingSnapshotStore)
+        game_session_store = await container.get(GameSessionStore)
 
-    scheduler.add_job(
-        reset_overall_profit,
-        kwargs={"sessionmaker": sessionmaker},
-        trigger=CronTrigger(hour=0, minute=0, timezone="UTC"),
-        id="reset_daily_overall_profit",
-    )
+        scheduler.add_job(
+            leader_election.renew,
+            trigger=IntervalTrigger(seconds=SCHEDULER_LEASE_RENEW_INTERVAL_SECONDS),
+            next_run_time=datetime.datetime.now(),
+            id="renew_scheduler_lease",
+        )
+
+        # Cluster-wide jobs are executed only by the process currently holding the lease
+        scheduler.add_job(
+            leader_election.run,
+            args=[publish_ranking_snapshots],
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "ranking_snapshot_store": ranking_snapshot_store,
+            },
+            trigger=IntervalTrigger(seconds=RANKING_SNAPSHOT_INTERVAL_SECONDS),
+            next_run_time=datetime.datetime.now(),
+            id="publish_ranking_snapshots",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[settle_referral_rewards],
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "user_cache": user_cache,
+                "batch_size": REFERRAL_REWARDS_SETTLE_BATCH_SIZE,
+            },
+            trigger=IntervalTrigger(seconds=REFERRAL_REWARDS_SETTLE_INTERVAL_SECONDS),
+            id="settle_referral_rewards",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[flush_finished_games],
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "game_session_store": game_session_store,
+                "live_metrics": live_metrics,
+                "batch_size": FINISHED_GAMES_FLUSH_BATCH_SIZE,
+            },
+            trigger=IntervalTrigger(seconds=FINISHED_GAMES_FLUSH_INTERVAL_SECONDS),
+            id="flush_finished_games",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[reap_abandoned_games],
+            kwargs={
+                "game_session_store": game_session_store,
+                "abandoned_after_seconds": GAMES_ABANDONED_AFTER_SECONDS,
+                "batch_size": GAMES_REAP_BATCH_SIZE,
+            },
+            trigger=IntervalTrigger(seconds=GAMES_REAP_INTERVAL_SECONDS),
+            id="reap_abandoned_games",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[reconcile_games_in_progress],
+            kwargs={
+                "game_session_store": game_session_store,
+                "batch_size": GAMES_REAP_BATCH_SIZE,
+            },
+            trigger=IntervalTrigger(seconds=GAMES_IN_PROGRESS_RECONCILE_INTERVAL_SECONDS),
+            id="reconcile_games_in_progress",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[review_suspicious_games],
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "review_window_days": FRAUD_REVIEW_WINDOW_DAYS,
+                "history_days": FRAUD_REVIEW_HISTORY_DAYS,
+                "fetch_batch_size": FRAUD_REVIEW_FETCH_BATCH_SIZE,
+                "write_batch_size": FRAUD_REVIEW_WRITE_BATCH_SIZE,
+            },
+            trigger=IntervalTrigger(seconds=FRAUD_REVIEW_INTERVAL_SECONDS),
+            id="review_suspicious_games",
+        )
+
+        add_daily_cluster_job(
+            scheduler,
+            leader_election,
+            job=maintain_games_partitions,
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "premake_months": GAMES_PARTITIONS_PREMAKE_MONTHS,
+                "retention_months": GAMES_RETENTION_MONTHS,
+            },
+            trigger=CronTrigger(hour=2, minute=0, timezone="UTC"),
+        )
+
+        # Repairs drift of the incrementally maintained counters (e.g. after users deletion)
+        add_daily_cluster_job(
+            scheduler,
+            leader_election,
+            job=rebuild_referral_stats,
+            kwargs={"sessionmaker": sessionmaker},
+            trigger=CronTrigger(hour=3, minute=0, timezone="UTC"),
+        )
+
+        # Stats of the days not closed out yet are computed live, so a missed run only costs speed
+        add_daily_cluster_job(
+            scheduler,
+            leader_election,
+            job=close_out_daily_stats,
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "rewrite_days": DAILY_STATS_REWRITE_DAYS,
+            },
+            trigger=CronTrigger(hour=0, minute=15, timezone=CLIENT_SIDE_TIMEZONE),
+        )
+
+        # Counters in Redis are rebuilt from the database to drop increments lost in between
+        reconcile_live_metrics_job = add_daily_cluster_job(
+            scheduler,
+            leader_election,
+            job=reconcile_live_metrics,
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "live_metrics": live_metrics,
+                "batch_size": LIVE_METRICS_RECONCILE_BATCH_SIZE,
+            },
+            trigger=CronTrigger(hour=3, minute=30, timezone="UTC"),
+        )
+
+        # Unseeded counters are rebuilt right after the lease is taken instead of waiting a night
+        if await live_metrics.get_users_amounts() is None:
+            reconcile_live_metrics_job.modify(
+                next_run_time=datetime.datetime.now()
+                + datetime.timedelta(seconds=SCHEDULER_LEASE_RENEW_INTERVAL_SECONDS),
+            )
+
+        # Fire times of daily jobs that found no leader are run by the next one
+        scheduler.add_job(
+            leader_election.run_missed,
+            trigger=IntervalTrigger(seconds=SCHEDULER_MISSED_JOBS_CHECK_INTERVAL_SECONDS),
+            id="run_missed_cluster_jobs",
+        )
+
+        scheduler.add_job(
+            leader_election.run,
+            args=[record_presence_history],
+            kwargs={"presence_tracker": presence_tracker},
+            trigger=IntervalTrigger(seconds=PRESENCE_HISTORY_INTERVAL_SECONDS),
+            id="record_presence_history",
+        )
+
+    if run_worker_jobs:
+        activity_tracker = await container.get(ActivityTracker)
+
+        # Activity is buffered in the worker memory, so every worker flushes its own buffer
+        scheduler.add_job(
+            flush_users_activity,
+            kwargs={
+                "sessionmaker": sessionmaker,
+                "activity_tracker": activity_tracker,
+                "live_metrics": live_metrics,
+                "presence_tracker": presence_tracker,
+            },
+            trigger=IntervalTrigger(seconds=ACTIVITY_FLUSH_INTERVAL_SECONDS),
+            id="flush_users_activity",
+        )
 
     return scheduler
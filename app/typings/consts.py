@@ -1,4 +1,5 @@
-from typing import Final, Dict
+from datetime import timedelta
+from typing import Final, Dict, Tuple
 
 DAILY_GAME_ENERGY_AMOUNT: Final[int] = 5
 INITIAL_BALANCE: Final[int] = 0
@@ -10,9 +11,29 @@ FARMING_DURATION_HOURS: Final[int] = 10
 DEFAULT_REFERRAL_BONUS: Final[int] = 100
 DEFAULT_PREMIUM_REFERRAL_BONUS: Final[int] = 500
 
-RANKING_PLACE_LIMIT: Final[int] = 10000
 RANKING_CHUNK_SIZE: Final[int] = 100
 RANKING_MAX_TOP_PLACE: Final[int] = 1000
+RANKING_FIELDS: Final[Tuple[str, ...]] = (
+    "balance",
+    "daily_overall_profit",
+    "game_daily_highscore",
+    "game_alltime_highscore",
+)
+DAILY_RANKING_FIELDS: Final[Tuple[str, ...]] = (
+    "daily_overall_profit",
+    "game_daily_highscore",
+)
+# Within the epoch of the daily ones, these scores only ever grow
+MONOTONIC_RANKING_FIELDS: Final[Tuple[str, ...]] = (
+    "daily_overall_profit",
+    "game_daily_highscore",
+    "game_alltime_highscore",
+)
+DAILY_LEADERBOARD_TTL_SECONDS: Final[int] = 2 * 24 * 60 * 60
+LEADERBOARD_REBUILD_TIMEOUT_SECONDS: Final[int] = 60 * 60
+RANKING_REBUILD_BATCH_SIZE: Final[int] = 10000
+RANKING_SNAPSHOT_INTERVAL_SECONDS: Final[int] = 5
+RANKING_SNAPSHOT_TTL_SECONDS: Final[int] = 60
 
 REFERRAL_SYSTEM_PROFIT_PERCENT: Final[Dict[int, int | float]] = {
     1: 5,
@@ -21,6 +42,8 @@ REFERRAL_SYSTEM_PROFIT_PERCENT: Final[Dict[int, int | float]] = {
 }
 
 REFERRAL_SYSTEM_MAX_LEVEL: Final[int] = list(REFERRAL_SYSTEM_PROFIT_PERCENT.keys())[-1]
+REFERRAL_REWARDS_SETTLE_INTERVAL_SECONDS: Final[int] = 10
+REFERRAL_REWARDS_SETTLE_BATCH_SIZE: Final[int] = 10000
 
 GAME_SECONDS_MINUMUM_FOR_ONE_LAP: Final[int] = 6
 GAME_LEVELS_SUSPICION_AFTER: Final[int] = 9
@@ -35,6 +58,67 @@ GAME_LEVELS_POINTS_MAPPER: Final[Dict[int, int]] = {
     8: 493,
     9: 551,
 }
+GAME_REPLAY_MAX_EVENTS: Final[int] = 10000
+GAME_REPLAY_PROCESSES: Final[int] = 2
+GAME_REPLAY_QUEUE_DEPTH: Final[int] = 4
+GAME_REPLAY_TIMEOUT_SECONDS: Final[float] = 2
+GAME_SESSION_TTL_SECONDS: Final[int] = 30 * 60
+GAMES_ABANDONED_AFTER_SECONDS: Final[int] = 10 * 60
+GAMES_REAP_INTERVAL_SECONDS: Final[int] = 60
+GAMES_REAP_BATCH_SIZE: Final[int] = 1000
+GAMES_IN_PROGRESS_RECONCILE_INTERVAL_SECONDS: Final[int] = 10 * 60
+FINISHED_GAMES_FLUSH_INTERVAL_SECONDS: Final[int] = 5
+FINISHED_GAMES_FLUSH_BATCH_SIZE: Final[int] = 1000
+GAMES_PARTITIONS_PREMAKE_MONTHS: Final[int] = 2
+GAMES_RETENTION_MONTHS: Final[int] = 12
+
+FRAUD_REVIEW_INTERVAL_SECONDS: Final[int] = 15 * 60
+FRAUD_REVIEW_WINDOW_DAYS: Final[int] = 7
+FRAUD_REVIEW_HISTORY_DAYS: Final[int] = 30
+FRAUD_REVIEW_FETCH_BATCH_SIZE: Final[int] = 100000
+FRAUD_REVIEW_WRITE_BATCH_SIZE: Final[int] = 50000
+FRAUD_SCORE_Z_SCORE_THRESHOLD: Final[float] = 3.0
+FRAUD_MIN_HISTORY_GAMES: Final[int] = 10
+FRAUD_MAX_GAMES_PER_HOUR: Final[int] = 20
+FRAUD_RATE_WINDOW_SECONDS: Final[int] = 60 * 60
 
 
 ADMIN_STATS_PLOT_DAYS_AMOUNT: Final[int] = 14
+ADMIN_STATS_PLOT_MAX_BUCKETS: Final[int] = 24 * 31
+CLIENT_SIDE_TIMEZONE: Final[str] = "Europe/Moscow"
+STATS_PLOT_GRANULARITY_INTERVALS: Final[Dict[str, timedelta]] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# Covers the longest dynamic stats period, so lifted blocks are reflected there
+DAILY_STATS_REWRITE_DAYS: Final[int] = 30
+DAILY_STATS_NO_REFERRAL_LINK: Final[str] = ""
+
+PARALLEL_QUERY_TIMEOUT_SECONDS: Final[float] = 5
+
+# Day, week and month sketches outlive their period a bit, so the last one is still readable
+LIVE_METRICS_PERIODS_TTL_SECONDS: Final[Tuple[int, int, int]] = (
+    2 * 24 * 60 * 60,
+    8 * 24 * 60 * 60,
+    32 * 24 * 60 * 60,
+)
+LIVE_METRICS_RECONCILE_BATCH_SIZE: Final[int] = 10000
+LIVE_METRICS_REBUILD_TIMEOUT_SECONDS: Final[int] = 60 * 60
+
+PRESENCE_ONLINE_WINDOW_SECONDS: Final[int] = 5 * 60
+PRESENCE_RETENTION_SECONDS: Final[int] = 60 * 60
+PRESENCE_HISTORY_INTERVAL_SECONDS: Final[int] = 60
+PRESENCE_HISTORY_RETENTION_SECONDS: Final[int] = 24 * 60 * 60
+
+USER_CACHE_TTL_SECONDS: Final[int] = 60
+ACTIVITY_FLUSH_INTERVAL_SECONDS: Final[int] = 15
+
+SCHEDULER_LEASE_TTL_SECONDS: Final[int] = 30
+SCHEDULER_LEASE_RENEW_INTERVAL_SECONDS: Final[int] = 10
+SCHEDULER_MISFIRE_GRACE_SECONDS: Final[int] = 5 * 60
+SCHEDULER_MISSED_JOB_TOLERANCE_SECONDS: Final[int] = 10 * 60
+SCHEDULER_MISSED_JOBS_CHECK_INTERVAL_SECONDS: Final[int] = 60
+
+USERS_BACKFILL_BATCH_SIZE: Final[int] = 5000
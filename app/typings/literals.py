@@ -2,3 +2,4 @@ from typing import Literal
 
 RankingsPeriodLiteral = Literal["daily", "alltime"]
 RankingsTypeLiteral = Literal["game", "overall_profit"]
+StatsPlotGranularityLiteral = Literal["hour", "day", "week"]
@@ -1,8 +1,10 @@
+import base64
 import hashlib
 import hmac
 import os
+import uuid
 from binascii import Error
-from datetime import timedelta
+from datetime import UTC, datetime, timedelta
 from typing import Dict, Type
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -16,10 +18,13 @@ from starlette.requests import Request
 from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
 
 from app.config import config
+from app.database.models import Game
 from app.database.repositories.user import UserRepository
-from app.database.uow.base import BaseUoW
 from app.schemas.base import BaseChecksumEntity
 from app.schemas.general.auth import JWTParsedData, JWTValidationData, JWTExtraData
+from app.services.activity import ActivityTracker
+from app.services.user_cache import UserCache
+from app.typings.consts import GAMES_ABANDONED_AFTER_SECONDS
 
 CHECK_INIT_DATA = int(os.getenv("CHECK_INIT_DATA", 0))
 
@@ -43,6 +48,44 @@ class InitDataAuthManager:
         return True
 
 
+class GameTicketManager:
+    SIGNATURE_SIZE = 18
+
+    def __init__(self, secret_key: str, max_age_seconds: int = GAMES_ABANDONED_AFTER_SECONDS):
+        self.__secret_key = secret_key.encode()
+        self._max_age = timedelta(seconds=max_age_seconds)
+
+    def issue(self, game: Game) -> str:
+        started_at = int(game.created_at.replace(tzinfo=UTC).timestamp() * 1000)
+        payload = f"{uuid.UUID(game.id).hex}.{game.user_id}.{started_at}"
+
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, ticket: str) -> Game | None:
+        payload, _, signature = ticket.rpartition(".")
+
+        # Bytes are compared, since compare_digest rejects non-ASCII strings sent by crafted tickets
+        if not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            return None
+
+        game_id, user_id, started_at = payload.split(".")
+        game = Game(
+            id=str(uuid.UUID(game_id)),
+            user_id=int(user_id),
+            created_at=datetime.fromtimestamp(int(started_at) / 1000, tz=UTC).replace(tzinfo=None),
+        )
+
+        if datetime.utcnow() - game.created_at > self._max_age:
+            return None
+
+        return game
+
+    def _sign(self, payload: str) -> str:
+        digest = hmac.new(self.__secret_key, payload.encode(), hashlib.sha256).digest()
+
+        return base64.urlsafe_b64encode(digest[: self.SIGNATURE_SIZE]).decode()
+
+
 class JWTAuth(JwtAccess):
     def __init__(
         self,
@@ -69,7 +112,8 @@ class JWTAuth(JwtAccess):
     async def __call__(
         self,
         user_repo: FromDishka[UserRepository],
-        uow: FromDishka[BaseUoW],
+        user_cache: FromDishka[UserCache],
+        activity_tracker: FromDishka[ActivityTracker],
         bearer: JwtAuthBase.JwtAccessBearer = Security(JwtAccess._bearer),
     ) -> JWTValidationData | None:
         raw_jwt_data = await self._get_credentials(bearer=bearer, cookie=None)
@@ -77,12 +121,18 @@ class JWTAuth(JwtAccess):
         if self.skip_serialization:
             return None
 
-        user = await user_repo.get_by_id(model_id=raw_jwt_data.subject["user_id"])  # type: ignore[union-attr]
+        user_id = raw_jwt_data.subject["user_id"]  # type: ignore[union-attr]
+
+        user = await user_cache.get(user_id)
+        if user is None:
+            cache_version = await user_cache.get_version(user_id)
+            user = await user_repo.get_by_id(model_id=user_id)
+            await user_cache.fill(user, version=cache_version)
+
         if not user or user.is_banned:
             raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Access denied")
 
-        await user_repo.renew_last_activity_at(model_id=raw_jwt_data.subject["user_id"])  # type: ignore[union-attr]
-        await uow.commit()
+        activity_tracker.touch(user_id)
 
         return JWTValidationData(
             parsed_data=JWTParsedData.parse_obj(raw_jwt_data.subject),  # type: ignore[union-attr]
@@ -1,14 +1,16 @@
-from datetime import tzinfo, datetime, timedelta
+from datetime import tzinfo, datetime, timedelta, date, time, UTC
 
 import pytz
 
+from app.typings.consts import CLIENT_SIDE_TIMEZONE
+
 
 def get_aware_end_of_day(
     days_offset: int = 0,
     client_side_timezone: tzinfo | None = None,
 ) -> datetime:
     if not client_side_timezone:
-        client_side_timezone = pytz.timezone("Europe/Moscow")
+        client_side_timezone = pytz.timezone(CLIENT_SIDE_TIMEZONE)
 
     dt = datetime.now(tz=client_side_timezone) - timedelta(days=days_offset)
 
@@ -17,3 +19,35 @@ def get_aware_end_of_day(
         .astimezone(pytz.timezone("UTC"))
         .replace(tzinfo=None)
     )
+
+
+def get_client_side_date(client_side_timezone: tzinfo | None = None) -> date:
+    if not client_side_timezone:
+        client_side_timezone = pytz.timezone(CLIENT_SIDE_TIMEZONE)
+
+    return datetime.now(tz=client_side_timezone).date()
+
+
+def get_utc_start_of_client_side_day(
+    day: date,
+    client_side_timezone: pytz.BaseTzInfo | None = None,
+) -> datetime:
+    if not client_side_timezone:
+        client_side_timezone = pytz.timezone(CLIENT_SIDE_TIMEZONE)
+
+    return (
+        client_side_timezone.localize(datetime.combine(day, time.min))
+        .astimezone(pytz.timezone("UTC"))
+        .replace(tzinfo=None)
+    )
+
+
+def get_daily_epoch() -> date:
+    return datetime.now(tz=UTC).date()
+
+
+def get_month_start(months_offset: int = 0) -> date:
+    today = get_daily_epoch()
+    months = today.year * 12 + today.month - 1 + months_offset
+
+    return date(months // 12, months % 12 + 1, 1)
@@ -0,0 +1,72 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from app.typings.consts import (
+    FRAUD_MAX_GAMES_PER_HOUR,
+    FRAUD_MIN_HISTORY_GAMES,
+    FRAUD_SCORE_Z_SCORE_THRESHOLD,
+    GAME_LEVELS_POINTS_MAPPER,
+    GAME_LEVELS_SUSPICION_AFTER,
+    GAME_SECONDS_MINUMUM_FOR_ONE_LAP,
+)
+
+LEVELS_CUMULATIVE_POINTS = np.cumsum(list(GAME_LEVELS_POINTS_MAPPER.values()))
+MAX_POINTS_PER_SECOND = max(GAME_LEVELS_POINTS_MAPPER.values()) / GAME_SECONDS_MINUMUM_FOR_ONE_LAP
+
+
+def detect_suspicious_games(
+    scores: NDArray[np.int64],
+    durations: NDArray[np.float64],
+    games_per_hour: NDArray[np.int64],
+    history_games_amounts: NDArray[np.int64],
+    history_score_means: NDArray[np.float64],
+    history_score_deviations: NDArray[np.float64],
+) -> NDArray[np.bool_]:
+    too_high_rate = scores > durations * MAX_POINTS_PER_SECOND
+
+    score_outliers = _detect_score_outliers(
+        scores=scores,
+        history_games_amounts=history_games_amounts,
+        history_score_means=history_score_means,
+        history_score_deviations=history_score_deviations,
+    )
+
+    return (
+        detect_suspicious_progress(scores=scores, durations=durations)
+        | too_high_rate
+        | score_outliers
+        | (games_per_hour > FRAUD_MAX_GAMES_PER_HOUR)
+    )
+
+
+def detect_suspicious_progress(
+    scores: NDArray[np.int64] | int,
+    durations: NDArray[np.float64] | float,
+) -> NDArray[np.bool_] | np.bool_:
+    # Shared by the check on finish and the batch review, so both give a game the same verdict
+    completed_levels = np.searchsorted(LEVELS_CUMULATIVE_POINTS, scores, side="right")
+
+    too_many_levels = completed_levels >= GAME_LEVELS_SUSPICION_AFTER
+    too_fast_pace = durations <= completed_levels * GAME_SECONDS_MINUMUM_FOR_ONE_LAP
+
+    return too_many_levels | too_fast_pace
+
+
+def _detect_score_outliers(
+    scores: NDArray[np.int64],
+    history_games_amounts: NDArray[np.int64],
+    history_score_means: NDArray[np.float64],
+    history_score_deviations: NDArray[np.float64],
+) -> NDArray[np.bool_]:
+    outliers = np.zeros(scores.shape, dtype=np.bool_)
+
+    comparable = (history_games_amounts >= FRAUD_MIN_HISTORY_GAMES) & (
+        history_score_deviations > 0
+    )
+
+    z_scores = (scores[comparable] - history_score_means[comparable]) / history_score_deviations[
+        comparable
+    ]
+    outliers[comparable] = z_scores > FRAUD_SCORE_Z_SCORE_THRESHOLD
+
+    return outliers
@@ -1,3 +1,4 @@
+from app.typings.consts import DAILY_RANKING_FIELDS
 from app.typings.literals import RankingsTypeLiteral, RankingsPeriodLiteral
 
 
@@ -24,3 +25,11 @@ def get_ranking_field(
         raise NotImplementedError
 
     return field
+
+
+def get_ranking_score_attribute(ranking_field: str) -> str:
+    # Daily counters are only meaningful through their epoch-aware `current_*` hybrids
+    if ranking_field in DAILY_RANKING_FIELDS:
+        return f"current_{ranking_field}"
+
+    return ranking_field
@@ -0,0 +1,54 @@
+from app.typings.consts import (
+    GAME_LEVELS_POINTS_MAPPER,
+    GAME_REPLAY_MAX_EVENTS,
+    GAME_SECONDS_MINUMUM_FOR_ONE_LAP,
+)
+
+LEVELS_POINTS = list(GAME_LEVELS_POINTS_MAPPER.values())
+MINIMUM_LAP_MS = GAME_SECONDS_MINUMUM_FOR_ONE_LAP * 1000
+
+
+# Events log format: `<ms since start>:<points>,...`. Replay stops at the first event
+# breaking the game rules, so only points collected before it are counted
+def replay_game(events: str, duration_ms: int) -> int:
+    raw_events = events.split(",")
+
+    if len(raw_events) > GAME_REPLAY_MAX_EVENTS:
+        return 0
+
+    score = 0
+    level = 0
+    level_score = 0
+    level_started_at = 0
+    previous_event_at = 0
+
+    for raw_event in raw_events:
+        raw_event_at, _, raw_points = raw_event.partition(":")
+
+        try:
+            event_at, points = int(raw_event_at), int(raw_points)
+        except ValueError:
+            # Malformed logs prove no points at all
+            return 0
+
+        if event_at < previous_event_at or event_at > duration_ms or points <= 0:
+            break
+
+        replayed_score = score + level_score
+        level_score += points
+        level_points = LEVELS_POINTS[min(level, len(LEVELS_POINTS) - 1)]
+
+        # Levels past the last one keep the last level's requirements
+        while level_score >= level_points:
+            if event_at - level_started_at < MINIMUM_LAP_MS:
+                return replayed_score
+
+            level_score -= level_points
+            score += level_points
+            level += 1
+            level_started_at = event_at
+            level_points = LEVELS_POINTS[min(level, len(LEVELS_POINTS) - 1)]
+
+        previous_event_at = event_at
+
+    return score + level_score
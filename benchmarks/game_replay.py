@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.utils.replay import replay_game
+
+
+def generate_events(events_amount: int, seed: int) -> tuple[str, int]:
+    generator = random.Random(seed)
+    event_at = 0
+    events = []
+
+    for _ in range(events_amount):
+        event_at += generator.randint(150, 400)
+        events.append(f"{event_at}:{generator.randint(1, 3)}")
+
+    return ",".join(events), event_at
+
+
+def measure(processes: int, logs: list[tuple[str, int]]) -> float:
+    started_at = time.perf_counter()
+
+    if processes == 1:
+        for events, duration_ms in logs:
+            replay_game(events, duration_ms)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            list(
+                executor.map(
+                    replay_game,
+                    *zip(*logs),
+                    chunksize=max(1, len(logs) // (processes * 16)),
+                )
+            )
+
+    return len(logs) / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.game_replay")
+    parser.add_argument("--events", type=int, default=1000, help="events per game log")
+    parser.add_argument("--replays", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    logs = [generate_events(args.events, seed) for seed in range(args.replays)]
+
+    for processes in sorted({1, args.processes}):
+        replays_per_second = measure(processes, logs)
+        print(  # noqa: T201
+            f"processes={processes} events={args.events}: "
+            f"{replays_per_second:.0f} replays/s, {replays_per_second / processes:.0f} per core"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Added ranking indexes at users
+
+Revision ID: 3f9c1d7a52e8
+Revises: 7fea4b9f214a
+Create Date: 2024-07-01 12:15:42.517304
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d7a52e8'
+down_revision: Union[str, None] = '7fea4b9f214a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RANKING_COLUMNS = (
+    'balance',
+    'daily_overall_profit',
+    'game_daily_highscore',
+    'game_alltime_highscore',
+)
+
+
+def upgrade() -> None:
+    for column in RANKING_COLUMNS:
+        op.drop_index(f'ix_users_{column}', table_name='users')
+        op.create_index(
+            f'ix_users_{column}_ranking',
+            'users',
+            [sa.text(f'{column} DESC'), 'first_name', 'id'],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    for column in RANKING_COLUMNS:
+        op.drop_index(f'ix_users_{column}_ranking', table_name='users')
+        op.create_index(f'ix_users_{column}', 'users', [column], unique=False)
@@ -0,0 +1,66 @@
+"""Added daily_epoch column to users
+
+Revision ID: b41e7c9d2a6f
+Revises: 3f9c1d7a52e8
+Create Date: 2024-07-02 10:40:18.204761
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7c9d2a6f'
+down_revision: Union[str, None] = '3f9c1d7a52e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DAILY_RANKING_COLUMNS = (
+    'daily_overall_profit',
+    'game_daily_highscore',
+)
+
+
+def upgrade() -> None:
+    # Existing counters were reset at the last midnight, so they belong to the current day
+    op.add_column(
+        'users',
+        sa.Column(
+            'daily_epoch',
+            sa.Date(),
+            server_default=sa.text("(TIMEZONE('utc', now()))::date"),
+            nullable=False,
+        ),
+    )
+
+    for column in DAILY_RANKING_COLUMNS:
+        op.drop_index(f'ix_users_{column}_ranking', table_name='users')
+        op.create_index(
+            f'ix_users_{column}_ranking',
+            'users',
+            ['daily_epoch', sa.text(f'{column} DESC'), 'first_name', 'id'],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    # Counters left over from previous days have to be materialized before the epoch is dropped
+    op.execute(
+        "UPDATE users SET "
+        "game_energy = GREATEST(game_energy, 5), "
+        "game_daily_highscore = 0, "
+        "daily_overall_profit = 0 "
+        "WHERE daily_epoch < (TIMEZONE('utc', now()))::date"
+    )
+
+    for column in DAILY_RANKING_COLUMNS:
+        op.drop_index(f'ix_users_{column}_ranking', table_name='users')
+        op.create_index(
+            f'ix_users_{column}_ranking',
+            'users',
+            [sa.text(f'{column} DESC'), 'first_name', 'id'],
+            unique=False,
+        )
+
+    op.drop_column('users', 'daily_epoch')